@@ -3,13 +3,23 @@ import mysql.connector
 import pandas as pd
 from PIL import Image
 import io
-import binascii
-import base64
-import plotly.graph_objects as go
 import datetime
 import os
+import tempfile
 from dotenv import load_dotenv
-from generate_roster_pdf import generate_pdf, generate_text_roster, generate_consolidated_report, generate_memoriam_pdf, generate_missing_pdf # Import generation functions
+from report_refresher import start_refresher
+from roster_db import (get_data_version, get_date_parts, DATE_PART_COLUMNS, LOGIN_QUERY, LOGOUT_QUERY, POSTS_QUERY,
+                       MEMORIAM_WALL_QUERY, MISSING_WALL_QUERY)
+from report_store import open_report
+from photo_store import get_thumbnail, store_photo
+from photo_server import get_photo_url, start_photo_server
+from card_wall import CARD_WALL_PAGE_SIZES, get_photo_sources, render_graduate_wall, render_tribute_wall, TRACKED_CARD, MEMORIAM_CARD
+from report_metrics import get_last_build_runs
+from warmup import start_warmup
+import roster_export
+import roster_contacts
+import roster_stats
+import roster_data
 from sqlalchemy import create_engine, text
 
 # Load environment variables
@@ -43,57 +53,80 @@ def get_db_engine():
     except Exception as e:
         return None
 
-def load_data():
-    engine = get_db_engine()
-    if not engine:
-        return pd.DataFrame()
-        
-    query = "SELECT * FROM graduates"
-    try:
-        # Use connection from engine for robust handling
-        with engine.connect() as conn:
-            df = pd.read_sql(text(query), conn)
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame() # Return empty on error
-
-# Helper to convert binary/hex to image
-def get_image_from_blob(blob_data):
-    if not blob_data:
-        return None
-    try:
-        # Check if it's bytes or just hex string?
-        # Connector python returns bytes for BLOB.
-        image = Image.open(io.BytesIO(blob_data))
-        return image
-    except Exception as e:
+# Display widths of the photos in each view; thumbnails are made at exactly
+# these sizes (see photo_store.THUMBNAIL_SIZES)
+GRID_PHOTO_PX = 400
+LIST_PHOTO_PX = 60
+TRACKED_PHOTO_PX = 130
+CARD_PHOTO_PX = 150
+
+def get_photo_source(photo_hash, size):
+    # What st.image should show for a stored photo, `size` px wide: its hash
+    # URL when the photo server is configured (the browser caches it for
+    # good), else the cached encoded thumbnail. Both are passed through
+    # as they are; nothing is decoded on a rerun. None if there is no photo.
+    if not photo_hash:
         return None
+    return get_photo_url(photo_hash, size) or get_thumbnail(photo_hash, size)
+
+def paginate(count, key):
+    # Page size and page pickers for a card wall (see card_wall.py); returns
+    # the (start, end) slice of the `count` cards to show.
+    c_size, c_page, c_info = st.columns([1, 1, 2])
+    with c_size:
+        page_size = st.selectbox("Cards per page", CARD_WALL_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    pages = max(1, -(-count // page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages # The filter or page size shrank the wall
+    with c_page:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    end = min(start + page_size, count)
+    with c_info:
+        st.caption(f"Showing {start + 1 if count else 0}–{end} of {count} (page {page} of {pages})")
+    return start, end
 
 # Load Data
+# The version is read before the rows so it can never be newer than df.
+# df is the compact roster shared by all sessions (see roster_data.py):
+# filter it into new frames, never modify it in place.
+data_version = get_data_version(("graduates",))
 try:
-    df = load_data()
+    df = roster_data.get_roster(data_version)
 except Exception as e:
     st.error(f"Error connecting to database: {e}")
     st.stop()
 
-@st.cache_data(ttl=3600)
+# Background report refresher: one per server process, shared by all sessions
+@st.cache_resource
+def get_report_refresher():
+    return start_refresher()
+
+report_refresher = get_report_refresher()
+
+# Photo server (see photo_server.py): started once per server process when
+# PHOTO_SERVER_PORT is set
+@st.cache_resource
+def get_photo_server():
+    return start_photo_server()
+
+photo_server = get_photo_server()
+
+# Cache warm-up (see warmup.py): once per server process, on a background
+# thread, unless WARMUP_ON_START=0
+@st.cache_resource
+def get_warmup():
+    if os.getenv('WARMUP_ON_START', '1') == '0':
+        return None
+    return start_warmup()
+
+warmup_thread = get_warmup()
+
 def get_report_from_db(report_name):
-    conn = get_db_connection()
-    if not conn: return None, None
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT file_data, created_at FROM reports WHERE report_name = %s", (report_name,))
-        row = cursor.fetchone()
-        if row:
-            return row[0], row[1] # blob, timestamp
-        return None, None
-    except Exception as e:
-        return None, None
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+    # Stored reports are streamed chunk by chunk into a local file cache named
+    # by content hash, so a refreshed report is picked up immediately and the
+    # bytes are never held in memory here. Returns (open file, timestamp).
+    return open_report(report_name)
 
 # Helper to verify user
 def verify_user(roll_no):
@@ -102,7 +135,7 @@ def verify_user(roll_no):
         return None
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT name, roll_no FROM graduates WHERE roll_no = %s", (roll_no,))
+        cursor.execute(LOGIN_QUERY, (roll_no,))
         user = cursor.fetchone()
         cursor.fetchall() # Consume rest
         return user
@@ -143,7 +176,7 @@ def log_logout(log_id):
         current_time = datetime.datetime.now()
         logout_time = current_time.strftime('%H:%M:%S')
         
-        sql = "UPDATE user_logs SET logout_time = %s WHERE id = %s"
+        sql = LOGOUT_QUERY
         cursor.execute(sql, (logout_time, log_id))
         conn.commit()
     except Exception as e:
@@ -154,51 +187,16 @@ def log_logout(log_id):
 
 # Helper to check for today's events
 def check_today_events(df):
+    # Vectorized over the month/day columns stored with the dates
+    # (see roster_db.parse_month_day), no per-row string parsing
     today = datetime.datetime.now()
-    current_day = today.day
-    current_month_name = today.strftime("%b") # e.g., "Jan", "Feb"
-    
     events = []
-    
-    # Map for inconsistent month abbreviations if necessary (e.g. Sept vs Sep)
-    # Assuming standard 3-letter months based on "ddd-mmm" description and "12-Jun" example.
-    
-    for _, row in df.iterrows():
-        # Check DOB
-        if row['dob']:
-            try:
-                # Expected formats: "12-Jun", "7-May"
-                parts = row['dob'].split('-')
-                if len(parts) == 2:
-                    d = int(parts[0])
-                    m = parts[1]
-                    if d == current_day and m == current_month_name:
-                        events.append({
-                            'name': row['name'],
-                            'type': 'Birthday',
-                            'photo_1966': row['photo_1966'],
-                            'photo_current': row['photo_current']
-                        })
-            except:
-                pass # Ignore parse errors
-
-        # Check WAD
-        if row['wad']:
-            try:
-                parts = row['wad'].split('-')
-                if len(parts) == 2:
-                    d = int(parts[0])
-                    m = parts[1]
-                    if d == current_day and m == current_month_name:
-                        events.append({
-                            'name': row['name'],
-                            'type': 'Wedding Anniversary',
-                            'photo_1966': row['photo_1966'],
-                            'photo_current': row['photo_current']
-                        })
-            except:
-                pass
-                
+    for field, event_type in (('dob', 'Birthday'), ('wad', 'Wedding Anniversary')):
+        month_column, day_column = DATE_PART_COLUMNS[field]
+        matches = df[(df[month_column] == today.month) & (df[day_column] == today.day)]
+        for event in matches[['name', 'photo_1966_hash', 'photo_current_hash']].to_dict('records'):
+            event['type'] = event_type
+            events.append(event)
     return events
 
 # Popup Dialog
@@ -209,17 +207,17 @@ def show_event_popup(events):
         
         # Photos
         c1, c2 = st.columns(2)
-        p1 = get_image_from_blob(event['photo_1966'])
-        p2 = get_image_from_blob(event['photo_current'])
+        p1 = get_photo_source(event['photo_1966_hash'], CARD_PHOTO_PX)
+        p2 = get_photo_source(event['photo_current_hash'], CARD_PHOTO_PX)
         
         with c1:
             if p1:
-                st.image(p1, caption="1966", width=150)
+                st.image(p1, caption="1966", width=CARD_PHOTO_PX)
             else:
                 st.info("No 1966 Photo")
         with c2:
             if p2:
-                st.image(p2, caption="Current", width=150)
+                st.image(p2, caption="Current", width=CARD_PHOTO_PX)
             else:
                 st.info("No Current Photo")
                 
@@ -236,12 +234,20 @@ if 'show_popup' not in st.session_state:
 if 'table_key' not in st.session_state:
     st.session_state['table_key'] = 0
 
+# Header image, resized once per process instead of decoded on every rerun
+@st.cache_data
+def get_header_image(path, width):
+    image = Image.open(path)
+    image.thumbnail((width, width * 4))
+    out = io.BytesIO()
+    image.save(out, format='PNG')
+    return out.getvalue()
+
 # Title with Image (Always visible header)
 c_img, c_title = st.columns([1, 5])
 with c_img:
     try:
-        image = Image.open('gajendra.png')
-        st.image(image, width=100) 
+        st.image(get_header_image('gajendra.png', 100), width=100) 
     except FileNotFoundError:
         st.warning("gajendra.png not found")
 
@@ -296,7 +302,7 @@ st.sidebar.header("Filter & Search")
 search_term = st.sidebar.text_input("Search (Name or Roll No)", "")
 
 # Branch Filter
-unique_branches = sorted(df['branch'].dropna().unique().tolist())
+unique_branches = [b for b in df['branch'].cat.categories if b]
 unique_branches.insert(0, "All")
 selected_branch = st.sidebar.selectbox("Filter by Branch", unique_branches)
 
@@ -306,7 +312,7 @@ sort_option = st.sidebar.selectbox("Sort By", ["Name (A-Z)", "Country, City", "R
 view_mode = st.sidebar.radio("View Option", ["Grid View", "List View", "Table (Text)", "Table (with Icons)", "Statistics", "Items of Interest", "Missing Contacts", "In Memoriam", "Reports & Downloads", "About this App"])
 
 # Filtering
-filtered_df = df.copy()
+filtered_df = df
 if selected_branch != "All":
     filtered_df = filtered_df[filtered_df['branch'] == selected_branch]
 
@@ -417,23 +423,32 @@ def update_graduate(id, name, roll_no, hostel, dob, wad, spouse_name, lives_in,
         return
 
     cursor = conn.cursor()
+
+    # Month and day are parsed once, here, and stored next to the text
+    date_parts = get_date_parts({'dob': dob, 'wad': wad})
+    dob_parts = tuple(date_parts[c] for c in DATE_PART_COLUMNS['dob'])
+    wad_parts = tuple(date_parts[c] for c in DATE_PART_COLUMNS['wad'])
     
-    if new_photo_bytes:
-        # Update with photo
-        sql = """UPDATE graduates 
-                 SET name=%s, roll_no=%s, hostel=%s, dob=%s, wad=%s, spouse_name=%s, lives_in=%s, state=%s, country=%s, email=%s, phone=%s, branch=%s, photo_current=%s 
-                 WHERE id=%s"""
-        val = (name, roll_no, hostel, dob, wad, spouse_name, lives_in, state, country, email, phone, branch, new_photo_bytes, id)
-    else:
-        # Update without photo
-        sql = """UPDATE graduates 
-                 SET name=%s, roll_no=%s, hostel=%s, dob=%s, wad=%s, spouse_name=%s, lives_in=%s, state=%s, country=%s, email=%s, phone=%s, branch=%s 
-                 WHERE id=%s"""
-        val = (name, roll_no, hostel, dob, wad, spouse_name, lives_in, state, country, email, phone, branch, id)
-        
     try:
+        if new_photo_bytes:
+            # Update with photo (stored once in the photo store, referenced by
+            # hash); same transaction, so the row never points at a photo that
+            # was not stored
+            photo_hash = store_photo(cursor, new_photo_bytes)
+            sql = """UPDATE graduates 
+                     SET name=%s, roll_no=%s, hostel=%s, dob=%s, dob_month=%s, dob_day=%s, wad=%s, wad_month=%s, wad_day=%s, spouse_name=%s, lives_in=%s, state=%s, country=%s, email=%s, phone=%s, branch=%s, photo_current_hash=%s 
+                     WHERE id=%s"""
+            val = (name, roll_no, hostel, dob, *dob_parts, wad, *wad_parts, spouse_name, lives_in, state, country, email, phone, branch, photo_hash, id)
+        else:
+            # Update without photo
+            sql = """UPDATE graduates 
+                     SET name=%s, roll_no=%s, hostel=%s, dob=%s, dob_month=%s, dob_day=%s, wad=%s, wad_month=%s, wad_day=%s, spouse_name=%s, lives_in=%s, state=%s, country=%s, email=%s, phone=%s, branch=%s 
+                     WHERE id=%s"""
+            val = (name, roll_no, hostel, dob, *dob_parts, wad, *wad_parts, spouse_name, lives_in, state, country, email, phone, branch, id)
         cursor.execute(sql, val)
         conn.commit()
+        if report_refresher:
+            report_refresher.notify() # Rebuild affected reports in the background
         st.success("Updated successfully!")
         st.rerun()
     except Exception as e:
@@ -444,15 +459,18 @@ def update_graduate(id, name, roll_no, hostel, dob, wad, spouse_name, lives_in,
 
 # Helper removed: save_changes_from_editor (Replaced by per-row Edit Dialog)
 
-# Helper to highlight user row
-def highlight_user(row):
-    try:
-        if st.session_state['user_info']['roll_no'] == row['roll_no']:
-            return ['background-color: lightyellow'] * len(row)
-        else:
-            return [''] * len(row)
-    except:
-        return [''] * len(row)
+# Marks the logged-in user's row in the table views with column operations
+# (an "Edit" marker and a "You" checkbox) rather than a per-row Styler
+def add_user_columns(df_view):
+    is_user = df_view['roll_no'] == st.session_state['user_info']['roll_no']
+    df_view.insert(0, "Edit", is_user.map({True: "✏️", False: ""}))
+    df_view.insert(1, "You", is_user)
+    return df_view
+
+USER_COLUMN_CONFIG = {
+    "Edit": st.column_config.TextColumn("Edit", width="small", help="Click row to edit"),
+    "You": st.column_config.CheckboxColumn("You", width="small", help="Your own row"),
+}
 
 # Edit Dialog
 @st.dialog("Edit Graduate Details")
@@ -544,54 +562,54 @@ else:
 
     if view_mode == "Grid View":
         st.info("Note: You can edit only your own details by clicking the edit icon (✏️) on your card.")
-        # Grid Layout
-        cols = st.columns(3) # 3 columns grid
-        
-        for idx, row in filtered_df.iterrows():
-            col = cols[idx % 3]
+        # The logged-in graduate's own card is rendered natively (it has the
+        # edit button); all other cards go into one HTML element per page
+        is_own = filtered_df['roll_no'] == st.session_state['user_info']['roll_no']
+        for _, row in filtered_df[is_own].iterrows():
+            with st.container(border=True):
+                c_title, c_edit = st.columns([0.8, 0.2])
+                with c_title:
+                    st.markdown(f"<div class='graduate-name'>{row['name']}</div>", unsafe_allow_html=True)
+                with c_edit:
+                    if st.button("✏️", key=f"edit_{row['id']}", help="Edit Details"):
+                        edit_dialog(row)
+
+                if row['branch']:
+                     st.markdown(f"<div class='branch-text'>{row['branch']}</div>", unsafe_allow_html=True)
+                st.markdown(f"<div class='roll-no'>Roll No: {row['roll_no']}</div>", unsafe_allow_html=True)
             
-            with col:
-                with st.container(border=True):
-                    c_title, c_edit = st.columns([0.8, 0.2])
-                    with c_title:
-                        st.markdown(f"<div class='graduate-name'>{row['name']}</div>", unsafe_allow_html=True)
-                    with c_edit:
-                        # ONLY show edit button if logged in user matches
-                        if st.session_state['user_info']['roll_no'] == row['roll_no']:
-                            if st.button("✏️", key=f"edit_{row['id']}", help="Edit Details"):
-                                edit_dialog(row)
-
-                    if row['branch']:
-                         st.markdown(f"<div class='branch-text'>{row['branch']}</div>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='roll-no'>Roll No: {row['roll_no']}</div>", unsafe_allow_html=True)
-                    
-                    # Photos
-                    c1, c2 = st.columns(2)
-                    p1 = get_image_from_blob(row['photo_1966'])
-                    p2 = get_image_from_blob(row['photo_current'])
+                # Photos
+                c1, c2 = st.columns(2)
+                p1 = get_photo_source(row['photo_1966_hash'], GRID_PHOTO_PX)
+                p2 = get_photo_source(row['photo_current_hash'], GRID_PHOTO_PX)
+            
+                with c1:
+                    if p1:
+                        st.image(p1, caption="1966", width="stretch")
+                    else:
+                        st.text("No Image")
+                with c2:
+                    if p2:
+                        st.image(p2, caption="Current", width="stretch")
+                    else:
+                        st.text("No Image")
                     
-                    with c1:
-                        if p1:
-                            st.image(p1, caption="1966", width="stretch")
-                        else:
-                            st.text("No Image")
-                    with c2:
-                        if p2:
-                            st.image(p2, caption="Current", width="stretch")
-                        else:
-                            st.text("No Image")
-                            
-                    # Details Expander
-                    with st.expander("View Details"):
-                        st.text(f"Hostel: {row['hostel']}")
-                        st.text(f"DOB: {row['dob']}")
-                        st.text(f"WAD: {row['wad'] if row['wad'] else '-'}")
-                        st.text(f"Spouse: {row.get('spouse_name') if row.get('spouse_name') else '-'}")
-                        st.text(f"Lives in: {row['lives_in']}, {row['state']}")
-                        if row['email']:
-                            st.markdown(f"📧 [{row['email']}](mailto:{row['email']})")
-                        if row['phone']:
-                            st.text(f"📞 {row['phone']}")
+                # Details Expander
+                with st.expander("View Details"):
+                    st.text(f"Hostel: {row['hostel']}")
+                    st.text(f"DOB: {row['dob']}")
+                    st.text(f"WAD: {row['wad'] if row['wad'] else '-'}")
+                    st.text(f"Spouse: {row.get('spouse_name') if row.get('spouse_name') else '-'}")
+                    st.text(f"Lives in: {row['lives_in']}, {row['state']}")
+                    if row['email']:
+                        st.markdown(f"📧 [{row['email']}](mailto:{row['email']})")
+                    if row['phone']:
+                        st.text(f"📞 {row['phone']}")
+
+        others = filtered_df[~is_own]
+        if not others.empty:
+            start, end = paginate(len(others), "grid")
+            st.html(render_graduate_wall(others.iloc[start:end].to_dict('records'), GRID_PHOTO_PX))
 
     elif view_mode == "List View":
         st.info("Note: You can edit only your own details by clicking the edit icon (✏️) in your row.")
@@ -602,13 +620,13 @@ else:
                 c_img, c_info, c_edit = st.columns([2, 5, 1])
                 
                 with c_img:
-                    p1 = get_image_from_blob(row['photo_1966'])
-                    p2 = get_image_from_blob(row['photo_current'])
+                    p1 = get_photo_source(row['photo_1966_hash'], LIST_PHOTO_PX)
+                    p2 = get_photo_source(row['photo_current_hash'], LIST_PHOTO_PX)
                     ic1, ic2 = st.columns(2)
                     with ic1:
-                        if p1: st.image(p1, width=60, caption="'66")
+                        if p1: st.image(p1, width=LIST_PHOTO_PX, caption="'66")
                     with ic2:
-                        if p2: st.image(p2, width=60, caption="Now")
+                        if p2: st.image(p2, width=LIST_PHOTO_PX, caption="Now")
 
                 with c_info:
                     st.markdown(f"**{row['name']}** <span style='color:grey'>({row['roll_no']})</span>", unsafe_allow_html=True)
@@ -636,22 +654,15 @@ else:
         # Create Dataframe for display
         df_view = filtered_df[cols_final].copy()
         
-        # Add visual "Edit" column conditionally
-        current_user_roll = st.session_state['user_info']['roll_no']
-        df_view.insert(0, "Edit", df_view['roll_no'].apply(lambda x: "✏️" if x == current_user_roll else ""))
-        
-        # Apply Styling
-        # Note: We need 'roll_no' in the dataframe to check user
-        # 'roll_no' is already in cols_final
-        
-        styled_df = df_view.style.apply(highlight_user, axis=1)
+        # Mark the user's row ('roll_no' is already in cols_final)
+        df_view = add_user_columns(df_view)
 
         event = st.dataframe(
-            styled_df,
+            df_view,
             hide_index=True,
             column_config={
                 "id": None, # Hide ID
-                "Edit": st.column_config.Column("Edit", width="small", help="Click row to edit")
+                **USER_COLUMN_CONFIG,
             },
             on_select="rerun",
             selection_mode="single-row",
@@ -662,7 +673,6 @@ else:
         if len(event.selection.rows) > 0:
             selected_row_index = event.selection.rows[0]
             # Get the exact row from the *displayed* dataframe (df_view)
-            # df_view has same index as styled_df if we didn't reset index? 
             # filtered_df might have gaps in index. 
             # st.dataframe preserves index or resets? 
             # "The selection.rows property contains a list of the integers of the selected rows." - These act as positional indices (0-based) relative to the displayed data.
@@ -684,18 +694,15 @@ else:
         st.subheader("Tabular View (with Photos)")
         st.info("Note: You can edit only your own row, marked by the edit symbol (✏️). Please select the checkbox for your row to edit.")
         
-        # Prepare data with base64 images
+        # Prepare data with photo URIs
         df_display = filtered_df.copy()
         
-        def blob_to_uri(blob):
-            if not blob: return None
-            try:
-                b64 = base64.b64encode(blob).decode('utf-8')
-                return f"data:image/jpeg;base64,{b64}"
-            except: return None
-            
-        df_display['photo_1966_uri'] = df_display['photo_1966'].apply(blob_to_uri)
-        df_display['photo_current_uri'] = df_display['photo_current'].apply(blob_to_uri)
+        # Hash URLs when the photo server is configured; otherwise one batched
+        # lookup of the small thumbnails, embedded as data URIs. Mapped onto
+        # the columns with a dict, not a per-row function.
+        photo_uris = get_photo_sources(pd.concat([df_display['photo_1966_hash'], df_display['photo_current_hash']]).dropna().unique(), LIST_PHOTO_PX)
+        df_display['photo_1966_uri'] = df_display['photo_1966_hash'].map(photo_uris)
+        df_display['photo_current_uri'] = df_display['photo_current_hash'].map(photo_uris)
         
         # Include ID
         cols_icons = ['id', 'photo_1966_uri', 'photo_current_uri', 'name', 'roll_no', 'branch', 'hostel', 'lives_in', 'email']
@@ -709,17 +716,13 @@ else:
             
         df_view_icons = df_display[cols_icons].copy()
         
-        # Add visual "Edit" column conditionally
-        current_user_roll = st.session_state['user_info']['roll_no']
-        df_view_icons.insert(0, "Edit", df_view_icons['roll_no'].apply(lambda x: "✏️" if x == current_user_roll else ""))
-        
-        styled_df_icons = df_view_icons.style.apply(highlight_user, axis=1)
+        df_view_icons = add_user_columns(df_view_icons)
         
         event_icons = st.dataframe(
-            styled_df_icons,
+            df_view_icons,
             column_config={
                 "id": None,
-                "Edit": st.column_config.Column("Edit", width="small", help="Click row to edit"),
+                **USER_COLUMN_CONFIG,
                 "photo_1966_uri": st.column_config.ImageColumn("1966 Photo", width="small"),
                 "photo_current_uri": st.column_config.ImageColumn("Current Photo", width="small"),
                 "name": "Name",
@@ -749,13 +752,15 @@ else:
                  st.warning(f"You can only edit your own details (Roll No: {current_user_roll}).")
 
     elif view_mode == "Statistics":
+        import plotly.graph_objects as go # Only loaded by sessions that open this view
         st.header("🎓 Statistics & Pareto Charts")
 
-        def draw_pareto(data, category_col, title):
-            # 1. Aggregate
-            counts = data[category_col].value_counts().reset_index()
-            counts.columns = [category_col, 'count']
-            counts = counts.sort_values(by='count', ascending=False)
+        # All distributions in one pass, shared with (and cached for) the PDF generator
+        stats = roster_stats.get_distributions(snapshot=df, version=data_version)
+
+        def draw_pareto(stat_name, category_col, title):
+            # 1. Aggregate (already sorted by count, descending)
+            counts = pd.DataFrame(list(stats.get(stat_name, {}).items()), columns=[category_col, 'count'])
             
             # 2. Cumulative Percentage
             counts['cumulative_percentage'] = counts['count'].cumsum() / counts['count'].sum() * 100
@@ -801,44 +806,23 @@ else:
         # 1. Graduates by Branch
         st.subheader("1. Graduates by Branch")
         if 'branch' in df.columns:
-            draw_pareto(df, 'branch', 'Graduates by Branch')
+            draw_pareto('branch', 'branch', 'Graduates by Branch')
         else:
             st.warning("Branch data not available")
 
         # 2. Graduates by DOB Month
         st.subheader("2. Graduates by DOB Month")
         if 'dob' in df.columns:
-            # Extract Month
-            def get_month(date_str):
-                if not date_str: return None
-                try:
-                    # User requested heuristic: Last 3 letters are the month
-                    # Data format example: "12-Jun"
-                    if len(date_str) >= 3:
-                        return date_str[-3:]
-                except:
-                    pass
-                return None
-
-            df_dob = df.copy()
-            df_dob['dob_month'] = df_dob['dob'].apply(get_month)
-            # Filter our NaNs
-            df_dob = df_dob.dropna(subset=['dob_month'])
-            
-            if not df_dob.empty:
-                draw_pareto(df_dob, 'dob_month', 'Graduates by DOB Month')
+            if stats.get('dob_month'):
+                draw_pareto('dob_month', 'dob_month', 'Graduates by DOB Month')
             else:
                 st.info("No valid DOB data found to parse months.")
 
         # 3. Graduates by WAD Month
         st.subheader("3. Graduates by WAD Month")
         if 'wad' in df.columns:
-            df_wad = df.copy()
-            df_wad['wad_month'] = df_wad['wad'].apply(get_month) # Reuse get_month
-            df_wad = df_wad.dropna(subset=['wad_month'])
-            
-            if not df_wad.empty:
-                draw_pareto(df_wad, 'wad_month', 'Graduates by WAD Month')
+            if stats.get('wad_month'):
+                draw_pareto('wad_month', 'wad_month', 'Graduates by WAD Month')
             else:
                 st.info("No valid WAD data found to parse months.")
 
@@ -849,23 +833,23 @@ else:
         
         with tab1:
             if 'lives_in' in df.columns:
-                draw_pareto(df, 'lives_in', 'Graduates by City/Lives In')
+                draw_pareto('lives_in', 'lives_in', 'Graduates by City/Lives In')
         
         with tab2:
             if 'country' in df.columns:
-                draw_pareto(df, 'country', 'Graduates by Country')
+                draw_pareto('country', 'country', 'Graduates by Country')
             else:
                 st.write("Country column missing")
 
         with tab3:
             if 'state' in df.columns:
-                draw_pareto(df, 'state', 'Graduates by State')
+                draw_pareto('state', 'state', 'Graduates by State')
             else:
                 st.write("State column missing")
                 
         with tab4:
              if 'hostel' in df.columns:
-                draw_pareto(df, 'hostel', 'Graduates by Hostel')
+                draw_pareto('hostel', 'hostel', 'Graduates by Hostel')
 
     elif view_mode == "Items of Interest":
         st.header("📌 Items of Interest")
@@ -876,7 +860,7 @@ else:
             if not engine: return pd.DataFrame()
             try:
                 with engine.connect() as conn:
-                    return pd.read_sql(text("SELECT * FROM posts ORDER BY created_at DESC"), conn)
+                    return pd.read_sql(text(POSTS_QUERY), conn)
             except:
                 return pd.DataFrame()
 
@@ -1023,7 +1007,7 @@ else:
             if not conn: return []
             cursor = conn.cursor(dictionary=True)
             try:
-                cursor.execute("SELECT * FROM tracked ORDER BY name")
+                cursor.execute(MISSING_WALL_QUERY)
                 return cursor.fetchall()
             except:
                 return []
@@ -1036,56 +1020,9 @@ else:
         if not tracked_data:
             st.info("No records found.")
         else:
-            cols = st.columns(3)
-            
-            st.markdown("""
-            <style>
-            .tracked-card {
-                background-color: #fff8e1; /* Light amber */
-                padding: 20px;
-                border-radius: 15px;
-                border: 1px solid #ffe082;
-                margin-bottom: 20px;
-                text-align: center;
-                box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-            }
-            .tracked-name {
-                font-size: 1.25em;
-                font-weight: bold;
-                color: #e67e22;
-                margin-top: 10px;
-            }
-            .tracked-details {
-                color: #555;
-                font-size: 0.9em;
-                margin-top: 5px;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-
-            for idx, row in enumerate(tracked_data):
-                col = cols[idx % 3]
-                with col:
-                    st.markdown('<div class="tracked-card">', unsafe_allow_html=True)
-                    
-                    if row['photo']:
-                        photo = get_image_from_blob(row['photo'])
-                        if photo:
-                            st.image(photo, width=130)
-                        else:
-                            st.text("No Photo")
-                    else:
-                        # Placeholder for text-only
-                        st.markdown("<div style='font-size:3em;'>👤</div>", unsafe_allow_html=True)
-                    
-                    st.markdown(f"""
-                        <div class="tracked-name">{row['name']}</div>
-                        <div class="tracked-details">
-                            <b>{row['branch']}</b><br>
-                            Roll No: {row['roll_no']}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+            start, end = paginate(len(tracked_data), "tracked")
+            st.html(render_tribute_wall(tracked_data[start:end], TRACKED_PHOTO_PX, TRACKED_CARD,
+                                        placeholder="<span style='font-size:3em;'>👤</span>"))
 
     elif view_mode == "In Memoriam":
         st.markdown("<h1 style='text-align: center; color: #555;'>🌹 In Loving Memory 🌹</h1>", unsafe_allow_html=True)
@@ -1097,7 +1034,7 @@ else:
             if not conn: return []
             cursor = conn.cursor(dictionary=True)
             try:
-                cursor.execute("SELECT * FROM memoriam ORDER BY name")
+                cursor.execute(MEMORIAM_WALL_QUERY)
                 return cursor.fetchall()
             except:
                 return []
@@ -1110,90 +1047,71 @@ else:
         if not mem_data:
             st.info("No records found.")
         else:
-            # Grid Layout
-            cols = st.columns(3)
-            
-            # Custom CSS for memoriam cards
-            st.markdown("""
-            <style>
-            .memoriam-card {
-                background-color: #fff0f5; /* Lavender Blush key */
-                padding: 20px;
-                border-radius: 15px;
-                border: 1px solid #eebbcc;
-                margin-bottom: 20px;
-                text-align: center;
-                box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-            }
-            .mem-name {
-                font-size: 1.3em;
-                font-weight: bold;
-                color: #4a4a4a;
-                margin-top: 10px;
-            }
-            .mem-details {
-                color: #666;
-                font-size: 0.95em;
-                margin-top: 5px;
-            }
-            .flower-icon {
-                font-size: 1.2em;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-
-            for idx, row in enumerate(mem_data):
-                col = cols[idx % 3]
-                with col:
-                    with st.container():
-                        # We use a container to apply the visual style implicitly via the card logic or directly elements
-                        # Since st.markdown(unsafe_allow_html) for div wrapping is tricky with st.image
-                        # We will use st.card-like structure
-                        
-                        # Render the card start
-                        st.markdown('<div class="memoriam-card">', unsafe_allow_html=True)
-                        
-                        # Image
-                        photo = get_image_from_blob(row['photo'])
-                        if photo:
-                            st.image(photo, width=150) # Centered by default in Streamlit column if we don't use 'width' too specific or column width
-                        else:
-                            st.text("No Photo")
-                        
-                        st.markdown(f"""
-                            <div class="mem-name">{row['name']} <span class="flower-icon">🕊️</span></div>
-                            <div class="mem-details">
-                                <b>{row['branch']}</b><br>
-                                Roll No: {row['roll_no']}
-                            </div>
-                            <div style="margin-top:10px; font-size:1.5em;">💐</div>
-                        </div>
-                        """, unsafe_allow_html=True)
+            start, end = paginate(len(mem_data), "memoriam")
+            st.html(render_tribute_wall(mem_data[start:end], CARD_PHOTO_PX, MEMORIAM_CARD))
 
     elif view_mode == "Reports & Downloads":
+        # Report generation (runs the generators in parallel); generate_roster_pdf
+        # and its PDF libraries load only when a build starts
+        from build_reports import build_reports
+        REPORT_LABELS = {
+            "directory": "Photo Directory",
+            "text": "Text Roster",
+            "memoriam": "In Memoriam",
+            "missing": "Missing Contacts",
+            "complete": "Complete Report",
+        }
+
         st.header("📊 Reports & Downloads")
         st.markdown("Generate and download the latest version of the Alumni Roster in PDF format.")
+        if report_refresher:
+            st.caption("Reports are refreshed automatically in the background shortly after the roster changes.")
 
         col_gen, col_info = st.columns([1, 2])
         with col_gen:
+            force_rebuild = st.checkbox("Rebuild even if data is unchanged", value=False)
             if st.button("🔄 Generate Latest Reports", type="primary"):
                 with st.status("Generating Reports...", expanded=True) as status:
-                    st.write("Initializing...")
-                    import time
-                    time.sleep(0.5)
-                    
-                    st.write("Processing Data & Images...")
-                    generate_consolidated_report("IITM_1971_Graduates_Complete_Report.pdf")
-                    st.write("Generating In Memoriam Report...")
-                    generate_memoriam_pdf("IITM_1971_In_Memoriam.pdf")
-                    st.write("Generating Missing Contacts Report...")
-                    generate_missing_pdf("IITM_1971_Missing_Contacts.pdf")
+                    st.write("Processing Data & Images (reports are built in parallel)...")
+                    build_reports(force=force_rebuild,
+                                  on_done=lambda key, path, seconds: st.write(f"{'✅' if path else '❌'} {REPORT_LABELS[key]} ({seconds:.1f}s)"))
                     
                     status.update(label="Generation Complete!", state="complete", expanded=False)
                 st.success("Reports generated and saved to DB successfully!")
-                get_report_from_db.clear() # Clear cache
                 st.rerun()
 
+            if st.button("⚡ Quick Draft Preview", help="Low-resolution photos and no charts; for checking the layout only. Not saved to the DB."):
+                with st.spinner("Building draft..."):
+                    results = build_reports(["complete"], profile="draft")
+                draft_path = results["complete"][0]
+                if draft_path:
+                    with open(draft_path, "rb") as f:
+                        st.download_button("📄 Download Draft (PDF)", data=f, file_name=os.path.basename(draft_path), mime="application/pdf")
+                else:
+                    st.error("Draft generation failed.")
+
+        with col_info:
+            # Where the time went in the most recent print build (see report_metrics)
+            runs = get_last_build_runs()
+            if runs:
+                started = min(run['started_at'] for run in runs)
+                finished = max(run['started_at'] + datetime.timedelta(seconds=run['total_seconds']) for run in runs)
+                st.markdown(f"**Last build:** {started.strftime('%Y-%m-%d %H:%M')} · "
+                            f"{(finished - started).total_seconds():.1f}s total ({runs[0]['profile']} profile)")
+                stage_df = pd.DataFrame([run['stages'] for run in runs], index=[run['report_name'] for run in runs]).fillna(0)
+                st.bar_chart(stage_df, horizontal=True, height=220) # seconds per stage
+                run_df = pd.DataFrame(runs)[['report_name', 'status', 'total_seconds', 'rows_fetched',
+                                            'images_processed', 'cache_hits', 'pages', 'bytes_written']]
+                st.dataframe(run_df, hide_index=True, width="stretch",
+                             column_config={
+                                 "report_name": "Report", "status": "Status",
+                                 "total_seconds": st.column_config.NumberColumn("Seconds", format="%.1f"),
+                                 "rows_fetched": "Rows", "images_processed": "Images", "cache_hits": "Cache hits",
+                                 "pages": "Pages", "bytes_written": "Bytes",
+                             })
+            else:
+                st.caption("No build metrics recorded yet.")
+
         st.markdown("### Available Downloads")
         
         def get_file_info(filepath):
@@ -1221,6 +1139,7 @@ else:
                      mime="application/pdf",
                      width="stretch"
                  )
+                 data.close()
              else:
                  st.info("Complete Report not found in DB.")
 
@@ -1238,6 +1157,7 @@ else:
                      mime="application/pdf",
                      width="stretch"
                  )
+                 data.close()
              else:
                  st.info("Photo Directory not found in DB.")
 
@@ -1255,6 +1175,7 @@ else:
                      mime="application/pdf",
                      width="stretch"
                  )
+                 data.close()
              else:
                  st.info("Text Roster not found in DB.")
 
@@ -1276,6 +1197,7 @@ else:
                      mime="application/pdf",
                      width="stretch"
                  )
+                 data.close()
              else:
                  st.info("In Memoriam report not found in DB.")
 
@@ -1293,9 +1215,56 @@ else:
                      mime="application/pdf",
                      width="stretch"
                  )
+                 data.close()
              else:
                  st.info("Missing Contacts report not found in DB.")
 
+        # Spreadsheet exports: streamed from the DB into a temporary file
+        st.markdown("### Export Roster Data")
+        ec1, ec2, ec3, ec4 = st.columns([1, 3, 2, 2])
+        with ec1:
+            export_format = st.selectbox("Format", list(roster_export.EXPORT_FORMATS), format_func=str.upper)
+        with ec2:
+            export_columns = st.multiselect("Columns", roster_export.EXPORT_COLUMNS, default=list(roster_export.EXPORT_COLUMNS))
+        with ec3:
+            export_branch = st.selectbox("Branch", unique_branches, index=unique_branches.index(selected_branch), key="export_branch")
+        with ec4:
+            export_search = st.text_input("Name or Roll No contains", search_term, key="export_search")
+
+        def prepare_export(export, mime, suffix):
+            # Runs export(out) into a temporary file offered for download below.
+            # Only one pending export per session; the previous file is dropped.
+            old_export = st.session_state.pop('export_file', None)
+            if old_export and os.path.exists(old_export[0]):
+                os.remove(old_export[0])
+            with tempfile.NamedTemporaryFile("wb", suffix=suffix, delete=False) as out:
+                try:
+                    with st.spinner("Exporting..."):
+                        count = export(out)
+                    st.session_state['export_file'] = (out.name, mime, suffix, count)
+                except Exception as e:
+                    os.remove(out.name)
+                    st.error(f"Export failed: {e}")
+
+        eb1, eb2 = st.columns(2)
+        with eb1:
+            if st.button("📤 Prepare Export", disabled=not export_columns):
+                mime, suffix = roster_export.EXPORT_FORMATS[export_format]
+                prepare_export(lambda out: roster_export.export_roster(export_format, out, export_columns, export_branch, export_search),
+                               mime, suffix)
+        with eb2:
+            if st.button("📇 Prepare Contacts (vCard ZIP)", help="One vCard per graduate with photo, plus an index CSV. Uses the branch and search filters."):
+                prepare_export(lambda out: roster_contacts.export_contacts(out, export_branch, export_search),
+                               "application/zip", ".zip")
+
+        if 'export_file' in st.session_state:
+            export_path, mime, suffix, count = st.session_state['export_file']
+            if os.path.exists(export_path):
+                with open(export_path, "rb") as f:
+                    file_name = "IITM_1971_Contacts.zip" if suffix == ".zip" else f"IITM_1971_Graduates{suffix}"
+                    st.download_button(f"⬇️ Download {count} {'contacts' if suffix == '.zip' else 'rows'} ({suffix[1:].upper()})", data=f,
+                                       file_name=file_name, mime=mime)
+
     elif view_mode == "About this App":
         st.header("🚀 Building the Class of '71 Roster App")
         st.markdown("""
@@ -0,0 +1,170 @@
+import os
+import time
+import argparse
+import threading
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from report_metrics import RunMetrics, new_build_id
+
+# Builds the stored reports as a dependency graph. Reports whose inputs are
+# ready run concurrently in worker processes (ReportLab is pure Python, so
+# threads would serialize on the GIL), and a full refresh takes about as long
+# as the slowest report instead of the sum of all of them.
+#
+#     python build_reports.py                        # everything, one job per CPU
+#     python build_reports.py -r memoriam missing -j 2
+#     python build_reports.py --out-dir build --force
+#     python build_reports.py --profile draft         # quick layout proof, not stored
+#     python build_reports.py --vector-charts         # statistics as vector graphics
+#
+# generate_roster_pdf (ReportLab, matplotlib, pypdf, PIL) is imported only
+# when a report is actually built, so the app and the refresher can import
+# this module at startup for free.
+
+# key: (file name, generator in generate_roster_pdf, keys of the reports it needs first)
+REPORTS = {
+    "directory": ("IITM_1971_Graduates_Directory.pdf", "generate_pdf", ()),
+    "text": ("IITM_1971_Graduates_List.pdf", "generate_text_roster", ()),
+    "memoriam": ("IITM_1971_In_Memoriam.pdf", "generate_memoriam_pdf", ()),
+    "missing": ("IITM_1971_Missing_Contacts.pdf", "generate_missing_pdf", ()),
+    "complete": ("IITM_1971_Graduates_Complete_Report.pdf", "generate_consolidated_report", ("directory", "text")),
+}
+
+# Tables each report is built from
+REPORT_SOURCES = {
+    "directory": ("graduates",),
+    "text": ("graduates",),
+    "memoriam": ("memoriam",),
+    "missing": ("tracked",),
+    "complete": ("graduates",),
+}
+
+def reports_for_tables(tables):
+    return [key for key in REPORTS if set(REPORT_SOURCES[key]) & set(tables)]
+
+def resolve_reports(selected):
+    # Selected reports plus everything they depend on, dependencies first.
+    ordered = []
+    def visit(key):
+        if key in ordered:
+            return
+        for dep in REPORTS[key][2]:
+            visit(dep)
+        ordered.append(key)
+    for key in selected:
+        visit(key)
+    return ordered
+
+def get_generators():
+    return importlib.import_module("generate_roster_pdf")
+
+def run_report(key, out_dir, force, profile="print", build_id=None):
+    # Runs in a worker process; returns (output path or None, seconds taken).
+    # The generator records its run metrics under build_id.
+    file_name, generator_name, deps = REPORTS[key]
+    generators = get_generators()
+    generator = getattr(generators, generator_name)
+    started = time.perf_counter()
+    path = os.path.join(out_dir, file_name)
+    metrics = RunMetrics(os.path.basename(generators.get_output_filename(file_name, profile)), profile, build_id)
+    if deps:
+        # Dependencies were built by their own jobs; only merge here.
+        result = generator(path, force=force, build_parts=False, profile=profile, metrics=metrics)
+    else:
+        result = generator(path, force=force, profile=profile, metrics=metrics)
+    return result, time.perf_counter() - started
+
+# One build at a time per process (e.g. the Reports page button and the
+# background refresher), since both write the same files.
+_build_lock = threading.Lock()
+
+def build_reports(selected=None, out_dir=".", jobs=None, force=False, on_done=None, profile="print"):
+    # Builds `selected` report keys (default: all) and returns
+    # {key: (output path or None, seconds)}. on_done(key, path, seconds) is
+    # called in this process as each report finishes. A report whose
+    # dependency failed is not attempted.
+    with _build_lock:
+        return _build_reports(selected, out_dir, jobs, force, on_done, profile)
+
+def _build_reports(selected, out_dir, jobs, force, on_done, profile):
+    keys = resolve_reports(selected or list(REPORTS))
+    build_id = new_build_id()
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(keys)))
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = {}
+    def finish(key, result, seconds):
+        results[key] = (result, seconds)
+        if on_done:
+            on_done(key, result, seconds)
+
+    def ready(key):
+        return all(dep in results for dep in REPORTS[key][2])
+
+    def failed_deps(key):
+        return [dep for dep in REPORTS[key][2] if results[dep][0] is None]
+
+    pending = list(keys)
+
+    if jobs == 1:
+        for key in pending:
+            if failed_deps(key):
+                finish(key, None, 0.0)
+                continue
+            finish(key, *run_report(key, out_dir, force, profile, build_id))
+        return results
+
+    # Spawned workers do not inherit the parent's threads or open connections,
+    # nor its caches: hand them the statistics already computed here (e.g. by
+    # the Statistics view), so the text roster does not recompute them.
+    roster_stats = importlib.import_module("roster_stats")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=roster_stats.add_cached_distributions,
+                             initargs=(roster_stats.get_cached_distributions(),)) as pool:
+        running = {}
+        while pending or running:
+            for key in [k for k in pending if ready(k)]:
+                pending.remove(key)
+                if failed_deps(key):
+                    print(f"Skipping {key}: dependency failed ({', '.join(failed_deps(key))}).")
+                    finish(key, None, 0.0)
+                    continue
+                running[pool.submit(run_report, key, out_dir, force, profile, build_id)] = key
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                try:
+                    finish(key, *future.result())
+                except Exception as e:
+                    print(f"Error building {key}: {e}")
+                    finish(key, None, 0.0)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the roster PDF reports.")
+    parser.add_argument("-r", "--reports", nargs="+", choices=list(REPORTS), default=None,
+                        help="Reports to build (default: all). Dependencies are added automatically.")
+    parser.add_argument("-o", "--out-dir", default=".", help="Directory to write the PDFs to.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Reports to build in parallel (default: CPU count).")
+    parser.add_argument("-f", "--force", action="store_true", help="Rebuild even if the data is unchanged.")
+    parser.add_argument("-p", "--profile", choices=list(get_generators().PROFILES), default="print",
+                        help="Output profile: print (stored), draft (low-res, no charts) or layout (placeholders).")
+    parser.add_argument("--vector-charts", action="store_true",
+                        help="Draw the statistics charts as vector graphics instead of images (REPORT_VECTOR_CHARTS=1).")
+    args = parser.parse_args(argv)
+    if args.vector_charts:
+        # Read by generate_text_roster, here and in the spawned workers
+        os.environ['REPORT_VECTOR_CHARTS'] = "1"
+
+    started = time.perf_counter()
+    results = build_reports(args.reports, out_dir=args.out_dir, jobs=args.jobs, force=args.force, profile=args.profile,
+                            on_done=lambda key, path, seconds: print(f"[{key}] {'done' if path else 'FAILED'} in {seconds:.1f}s"))
+    print(f"Built {sum(1 for path, _ in results.values() if path)}/{len(results)} reports in {time.perf_counter() - started:.1f}s")
+    return 0 if all(path for path, _ in results.values()) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
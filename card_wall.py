@@ -0,0 +1,144 @@
+import base64
+from html import escape
+from photo_store import get_thumbnails
+from photo_server import get_photo_base_url, get_photo_url
+
+# Card walls (Grid View, Missing Contacts, In Memoriam) rendered as one HTML
+# fragment per page of cards instead of a Streamlit element tree per card.
+# A page of 24 graduates used to be ~250 elements (columns, containers,
+# markdown, images, expanders), each diffed and sent on every rerun; it is
+# now a single element whose photos the browser loads by URL (see
+# photo_server.py) and caches. Without a photo server the page's thumbnails
+# are fetched in one batch and embedded as data URIs.
+#
+# The fragments are static markup: anything interactive (the edit button on
+# the logged-in graduate's own card) stays a native widget in app.py.
+
+CARD_WALL_PAGE_SIZES = (12, 24, 48, 96)
+
+CARD_WALL_CSS = """
+<style>
+.card-wall {
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(%(min_width)dpx, 1fr));
+    gap: 16px;
+}
+.wall-card {
+    border: 1px solid rgba(49, 51, 63, 0.2);
+    border-radius: 10px;
+    padding: 14px;
+    box-sizing: border-box;
+}
+.wall-card img { display: block; border-radius: 6px; }
+.wall-card .no-photo { color: #888; font-size: 0.85em; padding: 20px 0; }
+.wall-photos { display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin-bottom: 8px; }
+.wall-photos figure { margin: 0; text-align: center; }
+.wall-photos img { width: 100%%; height: auto; }
+.wall-photos figcaption { color: #666; font-size: 0.8em; }
+.wall-card details { font-size: 0.9em; color: #333; }
+.wall-card details summary { cursor: pointer; color: #555; }
+.wall-card details div { margin-top: 2px; }
+.wall-card.tracked {
+    background-color: #fff8e1;
+    border: 1px solid #ffe082;
+    text-align: center;
+}
+.wall-card.memoriam {
+    background-color: #fff0f5;
+    border: 1px solid #eebbcc;
+    text-align: center;
+}
+.wall-card.tracked img, .wall-card.memoriam img { margin: 0 auto; }
+.tracked-name { font-size: 1.25em; font-weight: bold; color: #e67e22; margin-top: 10px; }
+.tracked-details { color: #555; font-size: 0.9em; margin-top: 5px; }
+.mem-name { font-size: 1.3em; font-weight: bold; color: #4a4a4a; margin-top: 10px; }
+.mem-details { color: #666; font-size: 0.95em; margin-top: 5px; }
+</style>
+"""
+
+GRADUATE_CARD = """<div class="wall-card">
+<div class="graduate-name">{name}</div>
+<div class="branch-text">{branch}</div>
+<div class="roll-no">Roll No: {roll_no}</div>
+<div class="wall-photos">{photo_1966}{photo_current}</div>
+<details><summary>View Details</summary>
+<div>Hostel: {hostel}</div>
+<div>DOB: {dob}</div>
+<div>WAD: {wad}</div>
+<div>Spouse: {spouse_name}</div>
+<div>Lives in: {lives_in}, {state}</div>
+{email}{phone}</details>
+</div>"""
+
+TRACKED_CARD = """<div class="wall-card tracked">
+{photo}
+<div class="tracked-name">{name}</div>
+<div class="tracked-details"><b>{branch}</b><br>Roll No: {roll_no}</div>
+</div>"""
+
+MEMORIAM_CARD = """<div class="wall-card memoriam">
+{photo}
+<div class="mem-name">{name} <span>🕊️</span></div>
+<div class="mem-details"><b>{branch}</b><br>Roll No: {roll_no}</div>
+<div style="margin-top:10px; font-size:1.5em;">💐</div>
+</div>"""
+
+def text(value, default=""):
+    # Escaped cell text; None, NaN and "" become `default`.
+    if value is None or value != value or value == "":
+        return default
+    return escape(str(value))
+
+def get_photo_sources(photo_hashes, size):
+    # {hash: img src} for one page of cards: hash URLs when the photo server
+    # is configured, else data URIs of thumbnails fetched in one batch.
+    photo_hashes = [h for h in photo_hashes if isinstance(h, str) and h]
+    if get_photo_base_url():
+        return {h: get_photo_url(h, size) for h in photo_hashes}
+    return {h: "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+            for h, data in get_thumbnails(photo_hashes, size).items()}
+
+def photo_tag(sources, photo_hash, size, caption=None, placeholder="No Image"):
+    src = sources.get(photo_hash) if isinstance(photo_hash, str) else None
+    img = (f'<img src="{escape(src)}" width="{size}" loading="lazy" alt="">' if src
+           else f'<div class="no-photo">{placeholder}</div>')
+    if caption is None:
+        return img
+    return f"<figure>{img}<figcaption>{caption}</figcaption></figure>"
+
+def render_wall(cards, min_width):
+    return (CARD_WALL_CSS % {"min_width": min_width}) + '<div class="card-wall">' + "".join(cards) + "</div>"
+
+def render_graduate_wall(rows, photo_px):
+    # rows: dicts (or Series) with the roster columns and photo hashes
+    sources = get_photo_sources([h for row in rows for h in (row['photo_1966_hash'], row['photo_current_hash'])], photo_px)
+    cards = []
+    for row in rows:
+        email = text(row['email'])
+        cards.append(GRADUATE_CARD.format(
+            name=text(row['name']),
+            branch=text(row['branch']),
+            roll_no=text(row['roll_no']),
+            photo_1966=photo_tag(sources, row['photo_1966_hash'], photo_px, "1966"),
+            photo_current=photo_tag(sources, row['photo_current_hash'], photo_px, "Current"),
+            hostel=text(row['hostel']),
+            dob=text(row['dob']),
+            wad=text(row['wad'], "-"),
+            spouse_name=text(row['spouse_name'], "-"),
+            lives_in=text(row['lives_in']),
+            state=text(row['state']),
+            email=f'<div>📧 <a href="mailto:{email}">{email}</a></div>' if email else "",
+            phone=f"<div>📞 {text(row['phone'])}</div>" if text(row['phone']) else "",
+        ))
+    return render_wall(cards, 280)
+
+def render_tribute_wall(rows, photo_px, template, placeholder="No Photo"):
+    # Missing Contacts (TRACKED_CARD) and In Memoriam (MEMORIAM_CARD) walls
+    sources = get_photo_sources([row['photo_hash'] for row in rows], photo_px)
+    cards = [template.format(
+        photo=photo_tag(sources, row['photo_hash'], photo_px, placeholder=placeholder),
+        name=text(row['name']),
+        branch=text(row['branch']),
+        roll_no=text(row['roll_no']),
+    ) for row in rows]
+    return render_wall(cards, 220)
@@ -1,37 +1,235 @@
 import os
 import io
-import mysql.connector
+import json
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image as PILImage
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Image, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-import matplotlib.pyplot as plt
+from reportlab.graphics.shapes import Drawing, Group, Rect, String
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+import matplotlib
+matplotlib.use("Agg") # Headless: the app server and the report workers have no display
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from pypdf import PdfWriter
 from dotenv import load_dotenv
+try:
+    import pikepdf # Optional: linearized, object-stream compressed output
+except ImportError:
+    pikepdf = None
+from roster_db import (get_db_connection, stream_rows, get_data_version, iter_batches,
+                       GRADUATES_BY_BRANCH_QUERY, MEMORIAM_REPORT_QUERY, MISSING_REPORT_QUERY)
+from photo_store import fetch_photo_batch
+import roster_stats
+from report_store import save_report_file
+from report_metrics import RunMetrics, stage
 
 # Load environment variables
 load_dotenv()
 
-def get_db_connection():
-    try:
-        return mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME')
-        )
-    except mysql.connector.Error as err:
-        print(f"Error connecting to DB: {err}")
+# Bump when the layout of the generated PDFs changes, so reports built from
+# unchanged data are still regenerated once with the new layout.
+REPORT_LAYOUT_VERSION = 3
+
+# Output profiles. "print" is the full-quality report stored in the DB.
+# "draft" is a quick layout proof: low-resolution photos, no statistics
+# charts and no page compression. "layout" goes further and draws grey
+# placeholders instead of fetching photos at all. Other profiles write to
+# "<name>_<profile>.pdf" and are never stored, so they can't replace the
+# print version.
+PROFILES = {
+    "print": {"images": "full", "image_px": None, "jpeg_quality": 75, "charts": True, "compression": 1, "optimize": True},
+    "draft": {"images": "thumbnail", "image_px": 120, "jpeg_quality": 40, "charts": False, "compression": 0, "optimize": False},
+    "layout": {"images": "placeholder", "image_px": None, "jpeg_quality": None, "charts": False, "compression": 0, "optimize": False},
+}
+
+def get_profile(profile):
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown report profile {profile!r}; expected one of {', '.join(PROFILES)}")
+    return PROFILES[profile]
+
+def get_output_filename(filename, profile):
+    if profile == "print":
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{profile}{ext}"
+
+def get_data_fingerprint(tables, variant="", data_version=None):
+    # Fingerprint of a report build: the data version of its source tables
+    # plus the layout version and `variant`, which distinguishes builds of
+    # the same data with different output options.
+    if data_version is None:
+        data_version = get_data_version(tables)
+    if not data_version:
         return None
+    digest = hashlib.sha256(f"layout:{REPORT_LAYOUT_VERSION};variant:{variant};data:{data_version}".encode())
+    return digest.hexdigest()
+
+def get_footer_stamp(fingerprint):
+    # Footer line identifying a build. It must not depend on the clock, or
+    # invariant=1 could never make identical content byte-identical:
+    # DATE_OVERRIDE if set, else the short build fingerprint.
+    override = os.getenv('DATE_OVERRIDE')
+    if override:
+        return f"Generated: {override}"
+    return f"Data version: {fingerprint[:12]}" if fingerprint else ""
+
+def dedupe_images(pdf):
+    # Points every page at one copy of each distinct image XObject. Matters
+    # for merged files, where each part brought its own copies. The copies
+    # left unreferenced are not written out on save.
+    seen = {}
+    replaced = 0
+    for page in pdf.pages:
+        resources = page.obj.get('/Resources')
+        xobjects = resources.get('/XObject') if resources is not None else None
+        if xobjects is None:
+            continue
+        for name in list(xobjects.keys()):
+            xobj = xobjects[name]
+            if xobj.get('/Subtype') != '/Image':
+                continue
+            attrs = sorted((str(k), str(v)) for k, v in xobj.items() if k not in ('/Length', '/SMask'))
+            digest = hashlib.sha256(xobj.read_raw_bytes())
+            digest.update(repr(attrs).encode())
+            if '/SMask' in xobj:
+                digest.update(xobj.SMask.read_raw_bytes())
+            key = digest.hexdigest()
+            if key in seen:
+                if xobj.objgen != seen[key].objgen:
+                    xobjects[name] = seen[key]
+                    replaced += 1
+            else:
+                seen[key] = xobj
+    return replaced
+
+def optimize_pdf(filename):
+    # Output stage for PDFs served to browsers: rewrites `filename`
+    # linearized ("fast web view", so the first page shows before the
+    # download finishes), with compressed object streams and duplicate
+    # images removed. deterministic_id keeps identical input byte-identical.
+    if pikepdf is None:
+        print("pikepdf is not installed; skipping PDF optimization.")
+        return False
+    tmp_filename = f"{filename}.opt.tmp"
+    try:
+        before = os.path.getsize(filename)
+        with pikepdf.open(filename) as pdf:
+            replaced = dedupe_images(pdf)
+            pdf.save(tmp_filename, linearize=True, compress_streams=True,
+                     object_stream_mode=pikepdf.ObjectStreamMode.generate, deterministic_id=True)
+        os.replace(tmp_filename, filename)
+        print(f"Optimized {filename}: {before} -> {os.path.getsize(filename)} bytes ({replaced} duplicate images removed)")
+        return True
+    except Exception as e:
+        print(f"Error optimizing {filename}: {e}")
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        return False
+
+def get_file_hash(filename, chunk_size=1024*1024):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_report_key(filename):
+    # Reports are stored under their bare file name, wherever they were written.
+    return os.path.basename(filename)
+
+def report_is_current(filename, fingerprint):
+    # True when the stored report was built from data matching `fingerprint`.
+    if not fingerprint:
+        return False
+    conn = get_db_connection()
+    if not conn:
+        return False
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT data_fingerprint FROM reports WHERE report_name = %s", (get_report_key(filename),))
+        row = cursor.fetchone()
+        return bool(row) and row[0] == fingerprint
+    except Exception as e:
+        print(f"Error reading report fingerprint: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+# Shared by all builds: spooled images are named by content, and the files
+# are reused by later builds of unchanged photos.
+IMAGE_SPOOL_DIR = os.getenv('IMAGE_SPOOL_DIR') or os.path.join(tempfile.gettempdir(), "roster_image_spool")
 
-def get_image_from_blob(blob, max_width=1.5*inch, max_height=2*inch):
+# Spooled images (and cached charts) no build has used for this long are removed.
+IMAGE_SPOOL_MAX_AGE = int(os.getenv('IMAGE_SPOOL_MAX_AGE_DAYS', '7')) * 24 * 3600
+
+def remove_unused_files(directory, max_age):
+    # Removes files in a shared cache directory that were not written or
+    # touched for max_age seconds. Files in use by a running build are recent.
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    cutoff = time.time() - max_age
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+class ImageSpool:
+    # Processed photos are written to disk and handed to ReportLab by path
+    # with lazy=2, so each image is only opened while it is being drawn and
+    # released right after. The story never holds image bytes.
+    #
+    # ReportLab names each image XObject after the md5 of its path, so files
+    # are named by the SHA-256 of their bytes in a fixed directory: the same
+    # photos give the same names, and with invariant=1 the same PDF bytes.
+    # Every build touches the files it uses; close() removes those no build
+    # has used for max_age seconds (photos that changed, old profiles).
+    def __init__(self, directory=IMAGE_SPOOL_DIR, max_age=IMAGE_SPOOL_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(self.directory, exist_ok=True)
+
+    def add(self, jpeg_bytes, width, height):
+        path = os.path.join(self.directory, f"{hashlib.sha256(jpeg_bytes).hexdigest()}.jpg")
+        try:
+            os.utime(path) # Still in use
+        except FileNotFoundError:
+            # Other threads and worker processes may write the same file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(jpeg_bytes)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return Image(path, width=width, height=height, lazy=2)
+
+    def close(self):
+        remove_unused_files(self.directory, self.max_age)
+
+def get_image_from_blob(blob, max_width=1.5*inch, max_height=2*inch, spool=None, max_px=None, quality=75):
+    # max_px downsamples the photo before embedding (used by the draft profile)
     if not blob:
         return None
     try:
         img_buffer = io.BytesIO(blob)
         pil_img = PILImage.open(img_buffer)
+        if max_px:
+            pil_img.draft('RGB', (max_px, max_px)) # Let the JPEG decoder skip detail we would discard
+            pil_img.thumbnail((max_px, max_px))
         
         if pil_img.mode != 'RGB':
             pil_img = pil_img.convert('RGB')
@@ -54,7 +252,12 @@ def get_image_from_blob(blob, max_width=1.5*inch, max_height=2*inch):
              final_w = final_h / aspect
 
         out_buffer = io.BytesIO()
-        pil_img.save(out_buffer, format='JPEG')
+        pil_img.save(out_buffer, format='JPEG', quality=quality)
+        pil_img.close()
+        
+        if spool:
+            return spool.add(out_buffer.getvalue(), final_w, final_h)
+
         out_buffer.seek(0)
         
         # Create ReportLab Image
@@ -64,18 +267,120 @@ def get_image_from_blob(blob, max_width=1.5*inch, max_height=2*inch):
         # print(f"Error processing image: {e}") 
         return None
 
-def generate_pdf(filename="IITM_1971_Graduates_Directory.pdf"):
+def get_placeholder_image(width, height):
+    # Grey box standing in for a photo in the "layout" profile
+    drawing = Drawing(width, height)
+    drawing.add(Rect(0, 0, width, height, fillColor=colors.Color(0.85, 0.85, 0.85), strokeColor=colors.grey))
+    return drawing
+
+# Print photos are resampled to this resolution at their printed size, so
+# full-size scans are not embedded only to be scaled down by the viewer.
+PRINT_IMAGE_DPI = 300
+
+# Threads decoding and resizing photos; Pillow releases the GIL while it works.
+IMAGE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Rows whose photos are fetched in one query and prepared together.
+PHOTO_BATCH_SIZE = 24
+
+def get_image_px(max_width, max_height, settings):
+    return settings['image_px'] or int(max(max_width, max_height) / inch * PRINT_IMAGE_DPI)
+
+def prepare_batch_images(photo_conn, table_name, column, rows, max_width, max_height, spool, settings, pool, metrics=None):
+    # Images for a batch of rows, in row order: one query for the whole batch,
+    # then decoding and resizing in parallel on `pool`.
+    if settings['images'] == "placeholder":
+        return [get_placeholder_image(max_width, max_height) for _ in rows]
+    with stage(metrics, "fetch"):
+        blobs = fetch_photo_batch(photo_conn, table_name, column, [row['id'] for row in rows])
+    max_px = get_image_px(max_width, max_height, settings)
+    with stage(metrics, "image_prep"):
+        images = list(pool.map(
+            lambda row: get_image_from_blob(blobs.get(row['id']), max_width=max_width, max_height=max_height,
+                                            spool=spool, max_px=max_px, quality=settings['jpeg_quality']),
+            rows))
+    if metrics:
+        metrics.count("images_processed", sum(1 for img in images if img))
+    return images
+
+# Card grids lay out (photo, text) cards side by side, with a gap column
+# between cards and a spacer row between card rows. Each Table holds
+# CARD_ROWS_PER_TABLE card rows, and tables of the same shape share one
+# TableStyle, so the layout cost per card is constant.
+CARD_GAP = 0.15*inch
+CARD_ROWS_PER_TABLE = 4
+
+def make_card_grid(cards, cards_per_row, photo_width, text_width, border_color, rows_per_table=CARD_ROWS_PER_TABLE):
+    # Yields Tables (each followed by a Spacer) for the `cards` iterable.
+    col_widths = []
+    for i in range(cards_per_row):
+        if i:
+            col_widths.append(CARD_GAP)
+        col_widths += [photo_width, text_width]
+
+    styles_by_shape = {}
+    def get_style(card_rows, last_row_cards):
+        key = (card_rows, last_row_cards)
+        if key not in styles_by_shape:
+            commands = [
+                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('LEFTPADDING', (0,0), (-1,-1), 6),
+                ('RIGHTPADDING', (0,0), (-1,-1), 6),
+                ('TOPPADDING', (0,0), (-1,-1), 6),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+            ]
+            for r in range(card_rows):
+                cards_in_row = cards_per_row if r < card_rows - 1 else last_row_cards
+                for c in range(cards_in_row):
+                    commands.append(('BOX', (c*3, r*2), (c*3 + 1, r*2), 1, border_color))
+            styles_by_shape[key] = TableStyle(commands)
+        return styles_by_shape[key]
+
+    def make_table(chunk):
+        data = []
+        row_heights = []
+        for start in range(0, len(chunk), cards_per_row):
+            if data:
+                data.append([""] * len(col_widths))
+                row_heights.append(CARD_GAP)
+            row = []
+            for i, (photo, text) in enumerate(chunk[start:start + cards_per_row]):
+                if i:
+                    row.append("")
+                row += [photo, text]
+            data.append(row + [""] * (len(col_widths) - len(row)))
+            row_heights.append(None)
+        card_rows = (len(chunk) + cards_per_row - 1) // cards_per_row
+        t = Table(data, colWidths=col_widths, rowHeights=row_heights, hAlign='LEFT')
+        t.setStyle(get_style(card_rows, len(chunk) - (card_rows - 1) * cards_per_row))
+        return t
+
+    for chunk in iter_batches(cards, cards_per_row * rows_per_table):
+        yield make_table(chunk)
+        yield Spacer(1, CARD_GAP)
+
+def generate_pdf(filename="IITM_1971_Graduates_Directory.pdf", force=False, profile="print", metrics=None):
+    settings = get_profile(profile)
+    filename = get_output_filename(filename, profile)
+    metrics = metrics or RunMetrics(get_report_key(filename), profile)
+    fingerprint = get_data_fingerprint(("graduates",))
+    if not force and report_is_current(filename, fingerprint):
+        print(f"{filename} is up to date, skipping.")
+        metrics.count("cache_hits")
+        metrics.finish("current")
+        return filename
+
     print("Connecting to database...")
-    conn = get_db_connection()
-    if not conn:
+    # Rows are streamed on one connection while photos are fetched on another.
+    conn = get_db_connection(consume_results=True)
+    photo_conn = get_db_connection()
+    if not conn or not photo_conn:
         print("Failed to connect.")
+        for c in (conn, photo_conn):
+            if c: c.close()
+        metrics.finish("failed")
         return
-
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM graduates ORDER BY branch, name")
-    rows = cursor.fetchall()
-    conn.close()
-    print(f"Fetched {len(rows)} records.")
     
     # Context to track state across pages
     class PdfContext:
@@ -107,10 +412,8 @@ def generate_pdf(filename="IITM_1971_Graduates_Directory.pdf"):
         page_num_text = f"Page {doc.page}"
         canvas.drawCentredString(letter[0]/2, 0.5*inch, page_num_text)
         
-        # Footer: Date (Right)
-        from datetime import datetime
-        date_text = datetime.now().strftime("%Y-%m-%d %H:%M")
-        canvas.drawRightString(letter[0] - 0.5*inch, 0.5*inch, date_text)
+        # Footer: Build stamp (Right)
+        canvas.drawRightString(letter[0] - 0.5*inch, 0.5*inch, get_footer_stamp(fingerprint))
         
         canvas.restoreState()
         
@@ -126,7 +429,9 @@ def generate_pdf(filename="IITM_1971_Graduates_Directory.pdf"):
 
 
     doc = SimpleDocTemplate(filename, pagesize=letter, # Portrait by default
-                            topMargin=1.0*inch, bottomMargin=0.75*inch, leftMargin=0.5*inch, rightMargin=0.5*inch)
+                            topMargin=1.0*inch, bottomMargin=0.75*inch, leftMargin=0.5*inch, rightMargin=0.5*inch,
+                            invariant=1, # Byte-identical output for identical content (see save_report_to_db)
+                            pageCompression=settings['compression'])
     elements = []
     styles = getSampleStyleSheet()
     title_style = styles['Heading1']
@@ -140,13 +445,62 @@ def generate_pdf(filename="IITM_1971_Graduates_Directory.pdf"):
     elements.append(Spacer(1, 0.2*inch))
 
     # Group by Branch
+    # Rows are streamed and turned into table cells as they arrive; the photos
+    # of each batch of rows are fetched together and spooled to disk, so no
+    # row or image is held twice.
     from collections import defaultdict
     branches = defaultdict(list)
-    for row in rows:
-        b_name = row['branch']
-        if not b_name:
-            b_name = "Unknown Branch"
-        branches[b_name].append(row)
+    spool = ImageSpool()
+    record_count = 0
+    try:
+        with ThreadPoolExecutor(IMAGE_WORKERS) as pool:
+            rows = metrics.timed(stream_rows(conn, GRADUATES_BY_BRANCH_QUERY), "fetch", "rows_fetched")
+            for batch in iter_batches(rows, PHOTO_BATCH_SIZE):
+                images_66 = prepare_batch_images(photo_conn, "graduates", "photo_1966", batch, 1.2*inch, 1.5*inch, spool, settings, pool, metrics)
+                images_curr = prepare_batch_images(photo_conn, "graduates", "photo_current", batch, 1.2*inch, 1.5*inch, spool, settings, pool, metrics)
+                for grad, img_66, img_curr in zip(batch, images_66, images_curr):
+                    record_count += 1
+                    branch_name = grad['branch']
+                    if not branch_name:
+                        branch_name = "Unknown Branch"
+
+                    # Construct details
+                    name = grad['name'] if grad['name'] else "Unknown"
+                    roll = grad['roll_no'] if grad['roll_no'] else ""
+            
+                    info_text = f"<b>{name}</b>"
+                    if roll:
+                        info_text += f" ({roll})"
+                    info_text += "<br/>"
+            
+                    # Add Branch to details (Requested Feature)
+                    info_text += f"<b>Branch:</b> {branch_name}<br/>"
+            
+                    extras = []
+                    if grad['hostel']: extras.append(f"<b>Hostel:</b> {grad['hostel']}")
+                    if grad['dob']: extras.append(f"<b>DOB:</b> {grad['dob']}")
+                    if grad['wad']: extras.append(f"<b>WAD:</b> {grad['wad']}")
+                    if grad['spouse_name']: extras.append(f"<b>Spouse:</b> {grad['spouse_name']}")
+            
+                    loc_parts = []
+                    if grad['lives_in']: loc_parts.append(grad['lives_in'])
+                    if grad['state']: loc_parts.append(grad['state'])
+                    if grad['country']: loc_parts.append(grad['country'])
+                    if loc_parts:
+                        extras.append(f"<b>Lives in:</b> {', '.join(loc_parts)}")
+            
+                    if grad['email']: extras.append(f"<b>Email:</b> {grad['email']}")
+                    if grad['phone']: extras.append(f"<b>Phone:</b> {grad['phone']}")
+            
+                    info_text += "<br/>".join(extras)
+            
+                    p_details = Paragraph(info_text, cell_style)
+            
+                    branches[branch_name].append([p_details, img_66, img_curr])
+    finally:
+        conn.close()
+        photo_conn.close()
+    print(f"Fetched {record_count} records.")
 
     first_branch = True
 
@@ -166,45 +520,7 @@ def generate_pdf(filename="IITM_1971_Graduates_Directory.pdf"):
         data = []
         # Header Row
         data.append(['Graduate Details', '1966', 'Current'])
-        
-        for grad in branches[branch_name]:
-            # Construct details
-            details = []
-            name = grad['name'] if grad['name'] else "Unknown"
-            roll = grad['roll_no'] if grad['roll_no'] else ""
-            
-            info_text = f"<b>{name}</b>"
-            if roll:
-                info_text += f" ({roll})"
-            info_text += "<br/>"
-            
-            # Add Branch to details (Requested Feature)
-            info_text += f"<b>Branch:</b> {branch_name}<br/>"
-            
-            extras = []
-            if grad['hostel']: extras.append(f"<b>Hostel:</b> {grad['hostel']}")
-            if grad['dob']: extras.append(f"<b>DOB:</b> {grad['dob']}")
-            if grad['wad']: extras.append(f"<b>WAD:</b> {grad['wad']}")
-            if grad['spouse_name']: extras.append(f"<b>Spouse:</b> {grad['spouse_name']}")
-            
-            loc_parts = []
-            if grad['lives_in']: loc_parts.append(grad['lives_in'])
-            if grad['state']: loc_parts.append(grad['state'])
-            if grad['country']: loc_parts.append(grad['country'])
-            if loc_parts:
-                extras.append(f"<b>Lives in:</b> {', '.join(loc_parts)}")
-            
-            if grad['email']: extras.append(f"<b>Email:</b> {grad['email']}")
-            if grad['phone']: extras.append(f"<b>Phone:</b> {grad['phone']}")
-            
-            info_text += "<br/>".join(extras)
-            
-            p_details = Paragraph(info_text, cell_style)
-            
-            img_66 = get_image_from_blob(grad['photo_1966'], max_width=1.2*inch, max_height=1.5*inch)
-            img_curr = get_image_from_blob(grad['photo_current'], max_width=1.2*inch, max_height=1.5*inch)
-            
-            data.append([p_details, img_66, img_curr])
+        data.extend(branches[branch_name])
 
         t = Table(data, colWidths=[5.0*inch, 1.25*inch, 1.25*inch], repeatRows=1)
         t.setStyle(TableStyle([
@@ -224,23 +540,108 @@ def generate_pdf(filename="IITM_1971_Graduates_Directory.pdf"):
 
     print("Building PDF...")
     try:
-        doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
+        with metrics.stage("build"):
+            doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
+        metrics.count("pages", doc.page)
         print(f"Successfully generated: {filename}")
-        save_report_to_db(filename, "Photo Directory")
+        if settings['optimize']:
+            with metrics.stage("optimize"):
+                optimize_pdf(filename)
+        if profile == "print":
+            upload_report(filename, "Photo Directory", fingerprint, metrics)
+        metrics.finish("built", filename)
+        return filename
     except Exception as e:
         print(f"Error building PDF: {e}")
+        metrics.finish("failed")
+        return None
+    finally:
+        spool.close()
+
+# Body rows per Table when a long list is laid out as consecutive tables.
+# A chunk fills about one page, so ReportLab only ever measures and splits
+# small tables and layout time grows linearly with the row count. Keep it
+# even so the ROWBACKGROUNDS striping carries on across chunks.
+TABLE_CHUNK_ROWS = 30
+
+def make_chunked_tables(header, rows, col_widths, table_style, chunk_rows=TABLE_CHUNK_ROWS):
+    # Yields Tables of at most chunk_rows rows from the `rows` iterable, each
+    # starting with `header` and sharing one TableStyle.
+    def make_table(chunk):
+        t = Table([header] + chunk, colWidths=col_widths, repeatRows=1)
+        t.setStyle(table_style)
+        return t
+
+    chunk = []
+    emitted = False
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield make_table(chunk)
+            emitted = True
+            chunk = []
+    if chunk or not emitted:
+        yield make_table(chunk)
+
+# Rendered chart PNGs, keyed by a hash of their counts and labels, so
+# unchanged statistics are not re-rendered on the next build. Vector charts
+# are cheap to draw and are built fresh for every report.
+CHART_CACHE_DIR = os.getenv('CHART_CACHE_DIR', os.path.join(tempfile.gettempdir(), "roster_chart_cache"))
 
-def get_month_from_str(date_str):
-    if not date_str: return None
+def get_chart_key(kind, categories, counts, title, xlabel, ylabel):
+    payload = json.dumps([kind, [str(c) for c in categories], counts, title, xlabel, ylabel])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def render_chart_png(categories, counts, title, xlabel, ylabel, path):
+    # Object-oriented matplotlib API: no pyplot global state, safe in threads.
+    fig = Figure(figsize=(8, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.bar([str(c) for c in categories], counts, color='skyblue')
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    fig.tight_layout()
+
+    # Write then rename so a concurrent build never reads a partial file
+    # (mkstemp: threads of one process must not share a temp name either)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
     try:
-        # Heuristic: Last 3 letters are the month, e.g. "12-Jan"
-        if len(date_str) >= 3:
-            return date_str[-3:]
-    except:
-        pass
-    return None
-
-def generate_plot_image(data, title, xlabel, ylabel, max_width=6*inch, max_height=4*inch):
+        with os.fdopen(fd, 'wb') as f:
+            fig.savefig(f, format='png', dpi=100)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def render_chart_drawing(categories, counts, title, xlabel, ylabel, width, height):
+    # Native ReportLab vector chart: scales without blur and adds no image data.
+    drawing = Drawing(width, height)
+    chart = VerticalBarChart()
+    chart.x = 45
+    chart.y = 75
+    chart.width = width - 65
+    chart.height = height - 110
+    chart.data = [counts]
+    chart.bars[0].fillColor = colors.skyblue
+    chart.valueAxis.valueMin = 0
+    chart.categoryAxis.categoryNames = [str(c) for c in categories]
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.categoryAxis.labels.fontSize = 7
+    drawing.add(chart)
+
+    drawing.add(String(width / 2, height - 18, title, textAnchor='middle', fontName='Helvetica-Bold', fontSize=12))
+    drawing.add(String(width / 2, 4, xlabel, textAnchor='middle', fontName='Helvetica', fontSize=9))
+    y_label = Group(String(0, 0, ylabel, textAnchor='middle', fontName='Helvetica', fontSize=9))
+    y_label.transform = (0, 1, -1, 0, 12, chart.y + chart.height / 2) # Rotate 90 degrees
+    drawing.add(y_label)
+    return drawing
+
+def generate_plot_image(data, title, xlabel, ylabel, max_width=6*inch, max_height=4*inch, vector=False, metrics=None):
     if not data:
         return None
     # data is a dict or Counter: {category: count}
@@ -250,36 +651,50 @@ def generate_plot_image(data, title, xlabel, ylabel, max_width=6*inch, max_heigh
     categories = list(sorted_data.keys())
     counts = list(sorted_data.values())
     
-    plt.figure(figsize=(8, 5))
-    plt.bar(categories, counts, color='skyblue')
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100)
-    plt.close()
-    buf.seek(0)
+    if vector:
+        return render_chart_drawing(categories, counts, title, xlabel, ylabel, max_width, max_height)
+
+    key = get_chart_key("png", categories, counts, title, xlabel, ylabel)
+    path = os.path.join(CHART_CACHE_DIR, f"{key}.png")
+    try:
+        os.utime(path) # Still in use (see remove_unused_files)
+        if metrics:
+            metrics.count("cache_hits")
+    except FileNotFoundError:
+        os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+        render_chart_png(categories, counts, title, xlabel, ylabel, path)
     
-    return Image(buf, width=max_width, height=max_height)
+    return Image(path, width=max_width, height=max_height)
+
+def generate_text_roster(filename="IITM_1971_Graduates_List.pdf", force=False, vector_charts=None, profile="print", metrics=None):
+    # vector_charts=True draws the statistics as ReportLab vector graphics
+    # instead of PNGs; by default REPORT_VECTOR_CHARTS=1 turns it on (see
+    # build_reports.py --vector-charts).
+    if vector_charts is None:
+        vector_charts = os.getenv('REPORT_VECTOR_CHARTS') == "1"
+    settings = get_profile(profile)
+    filename = get_output_filename(filename, profile)
+    metrics = metrics or RunMetrics(get_report_key(filename), profile)
+    # The data version is taken before any rows are read (see roster_stats.get_distributions)
+    data_version = get_data_version(("graduates",))
+    fingerprint = get_data_fingerprint(("graduates",), variant="vector" if vector_charts else "", data_version=data_version)
+    if not force and report_is_current(filename, fingerprint):
+        print(f"{filename} is up to date, skipping.")
+        metrics.count("cache_hits")
+        metrics.finish("current")
+        return filename
 
-def generate_text_roster(filename="IITM_1971_Graduates_List.pdf"):
     print("Connecting to database for Text Roster...")
-    conn = get_db_connection()
+    conn = get_db_connection(consume_results=True)
     if not conn:
         print("Failed to connect.")
+        metrics.finish("failed")
         return
-
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM graduates ORDER BY branch, name")
-    rows = cursor.fetchall()
-    conn.close()
     
     # Use Landscape for tabular data to fit more columns
     doc = SimpleDocTemplate(filename, pagesize=landscape(letter),
-                            topMargin=0.5*inch, bottomMargin=0.5*inch, leftMargin=0.5*inch, rightMargin=0.5*inch)
+                            topMargin=0.5*inch, bottomMargin=0.5*inch, leftMargin=0.5*inch, rightMargin=0.5*inch, invariant=1,
+                            pageCompression=settings['compression'])
     
     elements = []
     styles = getSampleStyleSheet()
@@ -302,46 +717,48 @@ def generate_text_roster(filename="IITM_1971_Graduates_List.pdf"):
     def on_page_text(canvas, doc):
         canvas.saveState()
         canvas.setFont('Helvetica', 9)
-        from datetime import datetime
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
-        date_str = os.getenv('DATE_OVERRIDE') if os.getenv('DATE_OVERRIDE') else current_time
-        
-        canvas.drawCentredString(landscape(letter)[0]/2, 0.25*inch, f"Page {doc.page} | Generated: {date_str}")
+        stamp = get_footer_stamp(fingerprint)
+        footer = f"Page {doc.page} | {stamp}" if stamp else f"Page {doc.page}"
+        canvas.drawCentredString(landscape(letter)[0]/2, 0.25*inch, footer)
         canvas.restoreState()
 
     # Table Header
     headers = ['Name', 'Roll No', 'Branch', 'Hostel', 'Lives In', 'Email', 'Phone']
-    data = [headers]
     
     # Table Data
-    for row in rows:
-        name = row['name'] if row['name'] else ""
-        roll = row['roll_no'] if row['roll_no'] else ""
-        branch = row['branch'] if row['branch'] else ""
-        hostel = row['hostel'] if row['hostel'] else ""
-        
-        lives = []
-        if row['lives_in']: lives.append(row['lives_in'])
-        if row['state']: lives.append(row['state'])
-        if row['country']: lives.append(row['country'])
-        location = ", ".join(lives)
-        
-        email = row['email'] if row['email'] else ""
-        phone = row['phone'] if row['phone'] else ""
-        
-        # Wrapping long text with SMALL STYLE
-        p_name = Paragraph(name, small_style)
-        p_loc = Paragraph(location, small_style)
-        p_email = Paragraph(email, small_style)
-        
-        data.append([p_name, roll, branch, hostel, p_loc, p_email, phone])
+    # Rows are streamed straight into table chunks.
+    def table_rows():
+        try:
+            rows = stream_rows(conn, GRADUATES_BY_BRANCH_QUERY)
+            for row in metrics.timed(rows, "fetch", "rows_fetched"):
+                name = row['name'] if row['name'] else ""
+                roll = row['roll_no'] if row['roll_no'] else ""
+                branch = row['branch'] if row['branch'] else ""
+                hostel = row['hostel'] if row['hostel'] else ""
+                
+                lives = []
+                if row['lives_in']: lives.append(row['lives_in'])
+                if row['state']: lives.append(row['state'])
+                if row['country']: lives.append(row['country'])
+                location = ", ".join(lives)
+                
+                email = row['email'] if row['email'] else ""
+                phone = row['phone'] if row['phone'] else ""
+                
+                # Wrapping long text with SMALL STYLE
+                p_name = Paragraph(name, small_style)
+                p_loc = Paragraph(location, small_style)
+                p_email = Paragraph(email, small_style)
+                
+                yield [p_name, roll, branch, hostel, p_loc, p_email, phone]
+        finally:
+            conn.close()
         
     # Table Style
     # Col Widths: Total ~10 inch available
     col_widths = [2.0*inch, 1.0*inch, 1.2*inch, 1.0*inch, 2.0*inch, 1.8*inch, 1.0*inch]
     
-    t = Table(data, colWidths=col_widths, repeatRows=1)
-    t.setStyle(TableStyle([
+    table_style = TableStyle([
         ('BACKGROUND', (0,0), (-1,0), colors.grey),
         ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
         ('ALIGN', (0,0), (-1,-1), 'LEFT'),
@@ -353,29 +770,39 @@ def generate_text_roster(filename="IITM_1971_Graduates_List.pdf"):
         ('GRID', (0,0), (-1,-1), 0.5, colors.black),
         ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.lightgrey]),
         ('FONTSIZE', (0,1), (-1,-1), 8), # Reduced Body Font
-    ]))
+    ])
     
-    elements.append(t)
+    # One page-sized table per chunk instead of one table for the whole class
+    elements.extend(make_chunked_tables(headers, table_rows(), col_widths, table_style))
     
     # --- Statistics Section ---
     elements.append(PageBreak())
     elements.append(Paragraph("Statistics", title_style))
     elements.append(Spacer(1, 0.2*inch))
     
-    from collections import Counter
-    
     # Calculate Stats
-    branches_data = Counter([r['branch'] for r in rows if r['branch']])
-    hostels_data = Counter([r['hostel'] for r in rows if r['hostel']])
-    countries_data = Counter([r['country'] for r in rows if r['country']])
-    states_data = Counter([r['state'] for r in rows if r['state']])
-    dob_months_data = Counter([get_month_from_str(r['dob']) for r in rows if get_month_from_str(r['dob'])])
-    wad_months_data = Counter([get_month_from_str(r['wad']) for r in rows if get_month_from_str(r['wad'])])
+    # Shared with the Statistics view: free if the app already computed this
+    # data version. Not needed at all when the profile leaves the charts out.
+    stats = {}
+    if settings['charts']:
+        with metrics.stage("stats"):
+            stats = roster_stats.get_distributions(version=data_version)
+    branches_data = stats.get('branch')
+    hostels_data = stats.get('hostel')
+    countries_data = stats.get('country')
+    states_data = stats.get('state')
+    dob_months_data = stats.get('dob_month')
+    wad_months_data = stats.get('wad_month')
 
     # Helper to add section
     def add_plot_section(heading, data, x_label):
         elements.append(Paragraph(heading, styles['Heading2']))
-        img = generate_plot_image(data, heading, x_label, "Count")
+        if not settings['charts']:
+            elements.append(Paragraph(f"Chart omitted in the {profile} profile.", styles['Normal']))
+            elements.append(Spacer(1, 0.2*inch))
+            return
+        with metrics.stage("charts"):
+            img = generate_plot_image(data, heading, x_label, "Count", vector=vector_charts, metrics=metrics)
         if img:
             elements.append(img)
         else:
@@ -403,24 +830,46 @@ def generate_text_roster(filename="IITM_1971_Graduates_List.pdf"):
     add_plot_section("Graduates by Wedding Anniversary Month", wad_months_data, "Month")
     
     try:
-        doc.build(elements, onFirstPage=on_page_text, onLaterPages=on_page_text)
+        with metrics.stage("build"):
+            doc.build(elements, onFirstPage=on_page_text, onLaterPages=on_page_text)
+        remove_unused_files(CHART_CACHE_DIR, IMAGE_SPOOL_MAX_AGE)
+        metrics.count("pages", doc.page)
         print(f"Successfully generated: {filename}")
-        save_report_to_db(filename, "Text Roster")
+        if settings['optimize']:
+            with metrics.stage("optimize"):
+                optimize_pdf(filename)
+        if profile == "print":
+            upload_report(filename, "Text Roster", fingerprint, metrics)
+        metrics.finish("built", filename)
+        return filename
     except Exception as e:
         print(f"Error building Text PDF: {e}")
+        metrics.finish("failed")
+        return None
+
+def generate_memoriam_pdf(filename="IITM_1971_In_Memoriam.pdf", force=False, profile="print", metrics=None):
+    settings = get_profile(profile)
+    filename = get_output_filename(filename, profile)
+    metrics = metrics or RunMetrics(get_report_key(filename), profile)
+    fingerprint = get_data_fingerprint(("memoriam",))
+    if not force and report_is_current(filename, fingerprint):
+        print(f"{filename} is up to date, skipping.")
+        metrics.count("cache_hits")
+        metrics.finish("current")
+        return filename
 
-def generate_memoriam_pdf(filename="IITM_1971_In_Memoriam.pdf"):
     print(f"Generating In Memoriam PDF: {filename}")
-    conn = get_db_connection()
-    if not conn: return
-    
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM memoriam ORDER BY name")
-    rows = cursor.fetchall()
-    conn.close()
+    conn = get_db_connection(consume_results=True)
+    photo_conn = get_db_connection()
+    if not conn or not photo_conn:
+        for c in (conn, photo_conn):
+            if c: c.close()
+        metrics.finish("failed")
+        return
     
     doc = SimpleDocTemplate(filename, pagesize=letter,
-                            topMargin=0.75*inch, bottomMargin=0.75*inch, leftMargin=0.75*inch, rightMargin=0.75*inch)
+                            topMargin=0.75*inch, bottomMargin=0.75*inch, leftMargin=0.75*inch, rightMargin=0.75*inch, invariant=1,
+                            pageCompression=settings['compression'])
     elements = []
     styles = getSampleStyleSheet()
     
@@ -439,64 +888,83 @@ def generate_memoriam_pdf(filename="IITM_1971_In_Memoriam.pdf"):
     elements.append(Paragraph("Remembering our dear batchmates", styles['Italic']))
     elements.append(Spacer(1, 0.3*inch))
     
-    if not rows:
+    # Layout: grid of cards, two per row, photo on the left of each
+    spool = ImageSpool()
+    record_count = 0
+    def cards():
+        nonlocal record_count
+        try:
+            with ThreadPoolExecutor(IMAGE_WORKERS) as pool:
+                rows = metrics.timed(stream_rows(conn, MEMORIAM_REPORT_QUERY), "fetch", "rows_fetched")
+                for batch in iter_batches(rows, PHOTO_BATCH_SIZE):
+                    images = prepare_batch_images(photo_conn, "memoriam", "photo", batch, 1.3*inch, 1.6*inch, spool, settings, pool, metrics)
+                    for row, img in zip(batch, images):
+                        record_count += 1
+                        if not img:
+                            # Placeholder text if no image
+                            img = Paragraph("No Photo", styles['Normal'])
+                            
+                        # Text Details
+                        name = row['name'] if row['name'] else "Unknown"
+                        branch = row['branch'] if row['branch'] else ""
+                        roll = row['roll_no'] if row['roll_no'] else ""
+                        
+                        p_text = f"<b>{name}</b><br/><br/>"
+                        if branch: p_text += f"{branch}<br/>"
+                        if roll: p_text += f"Roll No: {roll}"
+                        
+                        yield (img, Paragraph(p_text, styles['BodyText']))
+        finally:
+            conn.close()
+            photo_conn.close()
+
+    elements.extend(make_card_grid(cards(), 2, 1.5*inch, 1.75*inch, colors.lightgrey))
+
+    if not record_count:
         elements.append(Paragraph("No records found.", styles['Normal']))
-    else:
-        # Layout: List with Photo on left, text on right
-        for row in rows:
-            # Card Container
-            data = []
-            
-            # Photo
-            img = get_image_from_blob(row['photo'], max_width=1.5*inch, max_height=1.8*inch)
-            if not img:
-                # Placeholder text if no image, or empty cell
-                img = Paragraph("No Photo", styles['Normal'])
-                
-            # Text Details
-            name = row['name'] if row['name'] else "Unknown"
-            branch = row['branch'] if row['branch'] else ""
-            roll = row['roll_no'] if row['roll_no'] else ""
-            
-            p_text = f"<b>{name}</b><br/><br/>"
-            if branch: p_text += f"{branch}<br/>"
-            if roll: p_text += f"Roll No: {roll}"
-            
-            data.append([img, Paragraph(p_text, styles['BodyText'])])
-            
-            t = Table(data, colWidths=[2.0*inch, 4.5*inch])
-            t.setStyle(TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 10),
-                ('RIGHTPADDING', (0,0), (-1,-1), 10),
-                ('TOPPADDING', (0,0), (-1,-1), 10),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 10),
-                ('BOX', (0,0), (-1,-1), 1, colors.lightgrey),
-                ('ROUNDEDCORNERS', [10, 10, 10, 10]), # Rounded corners if supported, else ignored usually
-            ]))
-            
-            elements.append(t)
-            elements.append(Spacer(1, 0.15*inch))
 
     try:
-        doc.build(elements)
+        with metrics.stage("build"):
+            doc.build(elements)
+        metrics.count("pages", doc.page)
         print(f"Successfully generated: {filename}")
-        save_report_to_db(filename, "In Memoriam")
+        if settings['optimize']:
+            with metrics.stage("optimize"):
+                optimize_pdf(filename)
+        if profile == "print":
+            upload_report(filename, "In Memoriam", fingerprint, metrics)
+        metrics.finish("built", filename)
+        return filename
     except Exception as e:
         print(f"Error building Memoriam PDF: {e}")
+        metrics.finish("failed")
+        return None
+    finally:
+        spool.close()
+
+def generate_missing_pdf(filename="IITM_1971_Missing_Contacts.pdf", force=False, profile="print", metrics=None):
+    settings = get_profile(profile)
+    filename = get_output_filename(filename, profile)
+    metrics = metrics or RunMetrics(get_report_key(filename), profile)
+    fingerprint = get_data_fingerprint(("tracked",))
+    if not force and report_is_current(filename, fingerprint):
+        print(f"{filename} is up to date, skipping.")
+        metrics.count("cache_hits")
+        metrics.finish("current")
+        return filename
 
-def generate_missing_pdf(filename="IITM_1971_Missing_Contacts.pdf"):
     print(f"Generating Missing Contacts PDF: {filename}")
-    conn = get_db_connection()
-    if not conn: return
-    
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM tracked ORDER BY branch, name")
-    rows = cursor.fetchall()
-    conn.close()
+    conn = get_db_connection(consume_results=True)
+    photo_conn = get_db_connection()
+    if not conn or not photo_conn:
+        for c in (conn, photo_conn):
+            if c: c.close()
+        metrics.finish("failed")
+        return
     
     doc = SimpleDocTemplate(filename, pagesize=letter,
-                            topMargin=0.75*inch, bottomMargin=0.75*inch, leftMargin=0.75*inch, rightMargin=0.75*inch)
+                            topMargin=0.75*inch, bottomMargin=0.75*inch, leftMargin=0.75*inch, rightMargin=0.75*inch, invariant=1,
+                            pageCompression=settings['compression'])
     elements = []
     styles = getSampleStyleSheet()
     
@@ -506,105 +974,162 @@ def generate_missing_pdf(filename="IITM_1971_Missing_Contacts.pdf"):
     elements.append(Paragraph("Missing Contacts / Yet to Track", title_style))
     elements.append(Spacer(1, 0.2*inch))
     
-    if not rows:
+    card_style = ParagraphStyle('Card', parent=styles['Normal'], fontSize=9, leading=11)
+    
+    # Layout: grid of cards, three per row
+    spool = ImageSpool()
+    record_count = 0
+    def cards():
+        nonlocal record_count
+        try:
+            with ThreadPoolExecutor(IMAGE_WORKERS) as pool:
+                rows = metrics.timed(stream_rows(conn, MISSING_REPORT_QUERY), "fetch", "rows_fetched")
+                for batch in iter_batches(rows, PHOTO_BATCH_SIZE):
+                    # Photo (Small)
+                    images = prepare_batch_images(photo_conn, "tracked", "photo", batch, 0.8*inch, 1.0*inch, spool, settings, pool, metrics)
+                    for row, img in zip(batch, images):
+                        record_count += 1
+                        name = row['name'] if row['name'] else ""
+                        branch = row['branch'] if row['branch'] else ""
+                        roll = row['roll_no'] if row['roll_no'] else ""
+                        
+                        p_text = f"<b>{name}</b><br/>"
+                        if branch: p_text += f"{branch}<br/>"
+                        if roll: p_text += f"Roll No: {roll}"
+                        
+                        yield (img if img else "", Paragraph(p_text, card_style))
+        finally:
+            conn.close()
+            photo_conn.close()
+
+    elements.extend(make_card_grid(cards(), 3, 0.95*inch, 1.25*inch, colors.grey))
+
+    if not record_count:
         elements.append(Paragraph("No records found.", styles['Normal']))
-    else:
-        # Table Header
-        headers = ['Photo', 'Name', 'Branch', 'Roll No']
-        data = [headers]
-        
-        for row in rows:
-            # Photo (Small)
-            img = get_image_from_blob(row['photo'], max_width=0.8*inch, max_height=1.0*inch)
-            
-            name = row['name'] if row['name'] else ""
-            branch = row['branch'] if row['branch'] else ""
-            roll = row['roll_no'] if row['roll_no'] else ""
-            
-            data.append([img if img else "", name, branch, roll])
-            
-        t = Table(data, colWidths=[1.0*inch, 2.5*inch, 2.0*inch, 1.5*inch], repeatRows=1)
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ]))
-        
-        elements.append(t)
 
     try:
-        doc.build(elements)
+        with metrics.stage("build"):
+            doc.build(elements)
+        metrics.count("pages", doc.page)
         print(f"Successfully generated: {filename}")
-        save_report_to_db(filename, "Missing Contacts")
+        if settings['optimize']:
+            with metrics.stage("optimize"):
+                optimize_pdf(filename)
+        if profile == "print":
+            upload_report(filename, "Missing Contacts", fingerprint, metrics)
+        metrics.finish("built", filename)
+        return filename
     except Exception as e:
         print(f"Error building Missing Contacts PDF: {e}")
+        metrics.finish("failed")
+        return None
+    finally:
+        spool.close()
 
 
-def generate_consolidated_report(final_filename="IITM_1971_Graduates_Complete_Report.pdf"):
+def generate_consolidated_report(final_filename="IITM_1971_Graduates_Complete_Report.pdf", force=False, build_parts=True, profile="print", metrics=None):
+    # build_parts=False is used by build_reports.py, which builds the two
+    # parts itself (possibly in parallel) before calling this to merge them.
+    # Every generator records a RunMetrics (see report_metrics); build_reports
+    # passes one in to tag the run with its build.
+    settings = get_profile(profile)
+    final_filename = get_output_filename(final_filename, profile)
+    metrics = metrics or RunMetrics(get_report_key(final_filename), profile)
+    fingerprint = get_data_fingerprint(("graduates",))
+    if not force and report_is_current(final_filename, fingerprint):
+        print(f"{final_filename} is up to date, skipping.")
+        metrics.count("cache_hits")
+        metrics.finish("current")
+        return final_filename
+
     print("Generating consolidated report...")
     
     # 1. Generate Individual Reports
-    photo_pdf = "IITM_1971_Graduates_Directory.pdf"
-    text_pdf = "IITM_1971_Graduates_List.pdf"
+    # A part that is current in the DB still has to be rebuilt if it is not on
+    # disk, since the merge below reads the local files.
+    out_dir = os.path.dirname(final_filename)
+    photo_base = os.path.join(out_dir, "IITM_1971_Graduates_Directory.pdf")
+    text_base = os.path.join(out_dir, "IITM_1971_Graduates_List.pdf")
+    photo_pdf = get_output_filename(photo_base, profile)
+    text_pdf = get_output_filename(text_base, profile)
     
-    generate_pdf(photo_pdf)
-    generate_text_roster(text_pdf)
+    with metrics.stage("parts"):
+        if build_parts or not os.path.exists(photo_pdf):
+            generate_pdf(photo_base, force=force or not os.path.exists(photo_pdf), profile=profile,
+                         metrics=RunMetrics(get_report_key(photo_pdf), profile, metrics.build_id))
+        if build_parts or not os.path.exists(text_pdf):
+            generate_text_roster(text_base, force=force or not os.path.exists(text_pdf), profile=profile,
+                                 metrics=RunMetrics(get_report_key(text_pdf), profile, metrics.build_id))
     
     # 2. Merge
     merger = PdfWriter()
     
     try:
-        # Append Photo Directory
-        with open(photo_pdf, "rb") as f:
-            merger.append(f)
-            
-        # Append Text Roster
-        with open(text_pdf, "rb") as f:
-            merger.append(f)
-            
-        # Write Output
-        with open(final_filename, "wb") as f_out:
-            merger.write(f_out)
+        with metrics.stage("merge"):
+            # Append Photo Directory
+            with open(photo_pdf, "rb") as f:
+                merger.append(f)
+                
+            # Append Text Roster
+            with open(text_pdf, "rb") as f:
+                merger.append(f)
+                
+            # Write Output
+            with open(final_filename, "wb") as f_out:
+                merger.write(f_out)
+        metrics.count("pages", len(merger.pages))
             
         print(f"Successfully generated consolidated report: {final_filename}")
-        save_report_to_db(final_filename, "Complete Report")
+        if settings['optimize']:
+            # Also dedupes images shared by the directory and the text roster
+            with metrics.stage("optimize"):
+                optimize_pdf(final_filename)
+        if profile == "print":
+            upload_report(final_filename, "Complete Report", fingerprint, metrics)
+        metrics.finish("built", final_filename)
         return final_filename
     except Exception as e:
         print(f"Error merging PDFs: {e}")
+        metrics.finish("failed")
         return None
 
-def save_report_to_db(filename, report_custom_name):
+def upload_report(filename, report_custom_name, fingerprint, metrics):
+    # Stores a print build. A failed upload raises, so the build is reported
+    # as failed (and retried by the refresher) instead of looking stored.
+    with metrics.stage("upload"):
+        stored = save_report_to_db(filename, report_custom_name, fingerprint)
+    if stored is None:
+        raise RuntimeError(f"could not save {get_report_key(filename)} to the database")
+    if stored is False:
+        metrics.count("cache_hits")
+
+def save_report_to_db(filename, report_custom_name, fingerprint=None):
     # report_custom_name can be a friendly key, or we can use the filename as unique key
     # Schema says `report_name VARCHAR(255) NOT NULL UNIQUE`.
-    # Let's use the filenames as unique keys (e.g. "IITM_1971_Graduates_Directory.pdf") to match app logic.
-    # But wait, app logic in previous tool call output showed custom labels but checking for filenames on disk.
-    # I'll use filename as the key.
+    # The bare file name is the key (e.g. "IITM_1971_Graduates_Directory.pdf") to match app logic.
+    # The bytes are streamed from disk into report_chunks (see report_store);
+    # identical bytes are not re-sent, only the new fingerprint is recorded.
+    # Returns True if stored, False if unchanged, None on failure.
     
-    print(f"Saving {filename} to DB...")
+    report_name = get_report_key(filename)
+    print(f"Saving {report_name} to DB...")
     conn = get_db_connection()
     if not conn:
         print("Failed to connect to DB for saving report.")
-        return
+        return None
 
     try:
-        with open(filename, 'rb') as f:
-            file_data = f.read()
-            
-        cursor = conn.cursor()
-        # Upsert logic
-        sql = """INSERT INTO reports (report_name, file_data) 
-                 VALUES (%s, %s) 
-                 ON DUPLICATE KEY UPDATE file_data=%s, created_at=NOW()"""
-        cursor.execute(sql, (filename, file_data, file_data))
-        conn.commit()
-        print(f"Saved {filename} to database.")
+        content_hash = get_file_hash(filename)
+        if save_report_file(conn, report_name, filename, content_hash, fingerprint):
+            print(f"Saved {report_name} to database.")
+            return True
+        print(f"{report_name} unchanged in database, skipped upload.")
+        return False
     except Exception as e:
         print(f"Error saving report to DB: {e}")
+        return None
     finally:
         if conn and conn.is_connected():
-            cursor.close()
             conn.close()
 
 if __name__ == "__main__":
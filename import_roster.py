@@ -0,0 +1,405 @@
+import os
+import io
+import re
+import csv
+import json
+import hashlib
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from roster_db import get_db_connection, iter_batches, get_date_parts, DATE_PART_COLUMNS
+from photo_store import store_photo, get_hash_column
+
+# Bulk import of roster data and photos into graduates, memoriam or tracked.
+#
+# The source is split into units (a PDF page, or a block of CSV rows) that
+# are parsed in worker processes, photos included: each photo is decoded,
+# oriented, resized and re-encoded as JPEG there, so the main process only
+# receives ready-to-store records. Units come back in order and are upserted
+# in batched executemany transactions. After each commit the last finished
+# unit is written to a checkpoint file, and --resume continues from there.
+# --dry-run parses everything and reports what would be inserted or
+# updated without writing.
+#
+#     python import_roster.py IITM_1975_Graduates.pdf --dry-run
+#     python import_roster.py IITM_1975_Graduates.pdf --resume
+#     python import_roster.py memoriam.csv --table memoriam
+#
+# PDFs are read with pdfplumber, table by table: a header row names the
+# columns (e.g. "Name", "Roll No", "Branch", "1966", "Current"), and images
+# inside a photo column's cell become that row's photo. The Photo Directory
+# layout ("Graduate Details" cells of "Label: value" lines) is understood
+# too, so a generated directory can be imported back. CSV files use the
+# table's column names (or the same aliases) as headers; photo columns hold
+# image paths relative to the CSV file.
+
+TABLE_COLUMNS = {
+    "graduates": ("name", "roll_no", "branch", "hostel", "dob", "wad", "spouse_name", "lives_in",
+                  "state", "country", "email", "phone", "photo_1966", "photo_current"),
+    "memoriam": ("name", "roll_no", "branch", "photo"),
+    "tracked": ("name", "roll_no", "branch", "photo"),
+}
+PHOTO_COLUMNS = ("photo_1966", "photo_current", "photo")
+
+DETAILS = "__details__"
+LOCATION = "__location__"
+
+# Header text (lower case, letters and digits only) -> column
+HEADER_ALIASES = {
+    "name": "name", "rollno": "roll_no", "roll": "roll_no", "branch": "branch", "hostel": "hostel",
+    "dob": "dob", "dateofbirth": "dob", "wad": "wad", "weddinganniversary": "wad",
+    "spouse": "spouse_name", "spousename": "spouse_name", "livesin": "lives_in", "city": "lives_in",
+    "state": "state", "country": "country", "email": "email", "phone": "phone", "mobile": "phone",
+    "1966": "photo_1966", "photo1966": "photo_1966", "current": "photo_current", "photocurrent": "photo_current",
+    "photo": "photo", "graduatedetails": DETAILS,
+}
+# In PDF tables "Lives In" is the combined "city, state, country" column
+PDF_HEADER_ALIASES = dict(HEADER_ALIASES, livesin=LOCATION)
+
+# Labels used in the Photo Directory's details cell
+DETAIL_LABELS = {
+    "branch": "branch", "hostel": "hostel", "dob": "dob", "wad": "wad", "spouse": "spouse_name",
+    "lives in": LOCATION, "email": "email", "phone": "phone",
+}
+
+# Stored photos are normalized to at most this many pixels on the long side
+PHOTO_MAX_PX = 800
+PHOTO_QUALITY = 85
+# Resolution used when a photo has to be rendered from the page
+PHOTO_RENDER_DPI = 200
+
+CSV_UNIT_ROWS = 100
+IMPORT_BATCH_ROWS = 200
+
+def normalize_header(text):
+    return re.sub(r"[^a-z0-9]", "", str(text or "").lower())
+
+def map_headers(headers, aliases):
+    return [aliases.get(normalize_header(h)) for h in headers]
+
+def clean(value):
+    # Strips whitespace; empty values become None so they never overwrite data.
+    if value is None:
+        return None
+    value = re.sub(r"\s+", " ", str(value)).strip()
+    return value or None
+
+def split_location(text, record):
+    # "city, state, country" -> lives_in, state, country
+    parts = [p.strip() for p in (text or "").split(",") if p.strip()]
+    if not parts:
+        return
+    record["lives_in"] = parts[0]
+    if len(parts) >= 2:
+        record["country"] = parts[-1]
+    if len(parts) >= 3:
+        record["state"] = ", ".join(parts[1:-1])
+
+def parse_details(text, record):
+    # Photo Directory cell: "Name (Roll)" then "Label: value" lines; lines
+    # without a known label continue the previous value (wrapped text).
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    if not lines:
+        return
+    first = re.match(r"^(.*?)\s*\(([^()]*)\)\s*$", lines[0])
+    if first:
+        record["name"], record["roll_no"] = first.group(1), first.group(2)
+    else:
+        record["name"] = lines[0]
+    field = None
+    for line in lines[1:]:
+        label, sep, value = line.partition(":")
+        key = DETAIL_LABELS.get(label.strip().lower()) if sep else None
+        if key:
+            field = key
+            record[field] = value.strip()
+        elif field:
+            record[field] = f"{record[field]} {line}"
+    if LOCATION in record:
+        split_location(record.pop(LOCATION), record)
+
+def normalize_photo(source):
+    # JPEG bytes for image bytes or a PIL image, or None if unreadable.
+    try:
+        img = source if isinstance(source, Image.Image) else Image.open(io.BytesIO(source))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((PHOTO_MAX_PX, PHOTO_MAX_PX))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=PHOTO_QUALITY, optimize=True)
+        return out.getvalue()
+    except Exception:
+        return None
+
+def extract_pdf_image(page, image):
+    # Embedded JPEGs are taken as they are; anything else is rendered.
+    try:
+        stream = image["stream"]
+        filters = [getattr(f, "name", str(f)) for f, _ in stream.get_filters()]
+        if filters == ["DCTDecode"]:
+            return normalize_photo(stream.get_rawdata())
+    except Exception:
+        pass
+    try:
+        bbox = (max(image["x0"], 0), max(image["top"], 0), min(image["x1"], page.width), min(image["bottom"], page.height))
+        return normalize_photo(page.crop(bbox).to_image(resolution=PHOTO_RENDER_DPI).original)
+    except Exception:
+        return None
+
+def image_in_cell(image, cell):
+    if not cell:
+        return False
+    x = (image["x0"] + image["x1"]) / 2
+    y = (image["top"] + image["bottom"]) / 2
+    return cell[0] <= x <= cell[2] and cell[1] <= y <= cell[3]
+
+def parse_pdf_page(path, page_number, columns):
+    # Records found in the tables of one page (0-based page_number).
+    import pdfplumber
+    records = []
+    with pdfplumber.open(path) as pdf:
+        page = pdf.pages[page_number]
+        for table in page.find_tables():
+            rows = table.extract()
+            if not rows:
+                continue
+            fields = map_headers(rows[0], PDF_HEADER_ALIASES)
+            if not any(fields):
+                print(f"Page {page_number + 1}: skipped a table without a recognized header row.")
+                continue
+            for row_cells, row in zip(table.rows[1:], rows[1:]):
+                record = {}
+                for field, value in zip(fields, row):
+                    if field == DETAILS:
+                        parse_details(value, record)
+                    elif field == LOCATION:
+                        split_location(value, record)
+                    elif field and field not in PHOTO_COLUMNS:
+                        record[field] = value
+                for field, cell in zip(fields, row_cells.cells):
+                    if field in PHOTO_COLUMNS and field in columns:
+                        images = [img for img in page.images if image_in_cell(img, cell)]
+                        if images:
+                            record[field] = extract_pdf_image(page, images[0])
+                records.append(record)
+        page.close()
+    return records
+
+def parse_csv_rows(base_dir, rows, columns):
+    # Records for a block of CSV rows; photo cells are image paths.
+    records = []
+    for row in rows:
+        record = {}
+        for field, value in row.items():
+            if field in PHOTO_COLUMNS:
+                if field in columns and clean(value):
+                    try:
+                        with open(os.path.join(base_dir, clean(value)), "rb") as f:
+                            record[field] = normalize_photo(f.read())
+                    except OSError as e:
+                        print(f"Missing photo {value}: {e}")
+            elif field:
+                record[field] = value
+        records.append(record)
+    return records
+
+def finish_records(records, columns):
+    # Keeps the table's columns, cleaned, adds the month/day columns derived
+    # from dob and wad, and drops rows without a name.
+    finished = []
+    for record in records:
+        out = {c: (record.get(c) if c in PHOTO_COLUMNS else clean(record.get(c))) for c in columns}
+        out.update(get_date_parts(out))
+        if out["name"]:
+            finished.append(out)
+    return finished
+
+def get_write_columns(columns):
+    # Columns written for parsed records: the parsed ones plus those derived from their dates.
+    return tuple(columns) + tuple(c for field, derived in DATE_PART_COLUMNS.items() if field in columns for c in derived)
+
+def parse_unit(source, unit, columns):
+    # Runs in a worker process: returns the finished records of one unit.
+    kind, arg = unit
+    if kind == "page":
+        records = parse_pdf_page(source, arg, columns)
+    else:
+        records = parse_csv_rows(os.path.dirname(os.path.abspath(source)), arg, columns)
+    return finish_records(records, columns)
+
+def iter_units(source):
+    # ("page", index) per PDF page, or ("rows", [dict, ...]) per CSV block.
+    if source.lower().endswith(".pdf"):
+        import pdfplumber
+        with pdfplumber.open(source) as pdf:
+            page_count = len(pdf.pages)
+        for i in range(page_count):
+            yield ("page", i)
+    else:
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            fields = map_headers(reader.fieldnames or [], HEADER_ALIASES)
+            rows = ({field: value for field, value in zip(fields, row.values()) if field} for row in reader)
+            for block in iter_batches(rows, CSV_UNIT_ROWS):
+                yield ("rows", block)
+
+def iter_parsed(pool, source, units, columns, window):
+    # parse_unit() over `units` on `pool`, yielding results in unit order with
+    # at most `window` units in flight, so a large source is never queued whole.
+    in_flight = deque()
+    for unit in units:
+        in_flight.append(pool.submit(parse_unit, source, unit, columns))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+def get_record_key(record):
+    # Rows are matched on roll number, or on name when there is none.
+    return ("roll_no", record["roll_no"].upper()) if record.get("roll_no") else ("name", record["name"].lower())
+
+def find_existing(cursor, table, records):
+    # {record key: id} for the records that already exist in `table`.
+    existing = {}
+    rolls = sorted({r["roll_no"] for r in records if r.get("roll_no")})
+    names = sorted({r["name"] for r in records if not r.get("roll_no")})
+    for column, values in (("roll_no", rolls), ("name", names)):
+        for chunk in iter_batches(values, 500):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"SELECT id, {column} FROM {table} WHERE {column} IN ({placeholders})", tuple(chunk))
+            for row_id, value in cursor.fetchall():
+                key = (column, value.upper() if column == "roll_no" else value.lower())
+                existing.setdefault(key, row_id)
+    return existing
+
+def upsert_batch(conn, table, columns, records, dry_run=False):
+    # Inserts new rows and updates existing ones in one transaction.
+    # Missing values never overwrite stored data. Returns (inserted, updated).
+    by_key = {}
+    for record in records:
+        by_key[get_record_key(record)] = record # Last one wins within a batch
+    cursor = conn.cursor()
+    try:
+        existing = find_existing(cursor, table, list(by_key.values()))
+        inserts = [r for key, r in by_key.items() if key not in existing]
+        updates = [(key, r) for key, r in by_key.items() if key in existing]
+        if dry_run:
+            return len(inserts), len(updates)
+
+        # Photos go to the photo store; the rows get their hashes
+        db_columns = [get_hash_column(table, c) if c in PHOTO_COLUMNS else c for c in columns]
+        def values(record):
+            return tuple(store_photo(cursor, record[c]) if c in PHOTO_COLUMNS else record[c] for c in columns)
+
+        if inserts:
+            cursor.executemany(f"INSERT INTO {table} ({', '.join(db_columns)}) VALUES ({', '.join(['%s'] * len(db_columns))})",
+                               [values(r) for r in inserts])
+        if updates:
+            assignments = ", ".join(f"{c} = COALESCE(%s, {c})" for c in db_columns)
+            cursor.executemany(f"UPDATE {table} SET {assignments} WHERE id = %s",
+                               [values(r) + (existing[key],) for key, r in updates])
+        conn.commit()
+        return len(inserts), len(updates)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def get_source_hash(source, chunk_size=1024*1024):
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_checkpoint_path(source, table):
+    return f"{source}.{table}.import.json"
+
+def load_checkpoint(path, source_hash):
+    # Number of units already committed, or 0 if there is no checkpoint for
+    # this exact source file.
+    try:
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("source_hash") == source_hash:
+            return state.get("units_done", 0)
+        print("Source file changed since the checkpoint was written; starting over.")
+    except (OSError, ValueError):
+        pass
+    return 0
+
+def save_checkpoint(path, source_hash, units_done):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"source_hash": source_hash, "units_done": units_done}, f)
+    os.replace(tmp_path, path)
+
+def import_roster(source, table="graduates", dry_run=False, resume=False, jobs=None, batch_rows=IMPORT_BATCH_ROWS):
+    # Imports `source` into `table`; returns {"inserted", "updated", "units"}.
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    columns = TABLE_COLUMNS[table]
+    source_hash = get_source_hash(source)
+    checkpoint = get_checkpoint_path(source, table)
+    skip = load_checkpoint(checkpoint, source_hash) if resume else 0
+    if skip:
+        print(f"Resuming after {skip} units.")
+
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Failed to connect to the database.")
+
+    totals = {"inserted": 0, "updated": 0, "units": skip}
+    pending = []
+    def flush():
+        inserted, updated = upsert_batch(conn, table, get_write_columns(columns), pending, dry_run)
+        totals["inserted"] += inserted
+        totals["updated"] += updated
+        pending.clear()
+        if not dry_run:
+            save_checkpoint(checkpoint, source_hash, totals["units"])
+        print(f"{'Would import' if dry_run else 'Imported'} through unit {totals['units']}: "
+              f"{totals['inserted']} new, {totals['updated']} updated.")
+
+    units = (unit for i, unit in enumerate(iter_units(source)) if i >= skip)
+    jobs = jobs or os.cpu_count() or 1
+    try:
+        # Spawned workers do not inherit the open connection. Results arrive
+        # in unit order, so the checkpoint only ever moves forward.
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for records in iter_parsed(pool, source, units, columns, window=jobs * 2):
+                pending.extend(records)
+                totals["units"] += 1
+                if len(pending) >= batch_rows:
+                    flush()
+        if pending:
+            flush()
+    finally:
+        conn.close()
+
+    if not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint) # Finished: a later run starts from the beginning
+    return totals
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import roster data and photos from a PDF or CSV file.")
+    parser.add_argument("source", help="PDF or CSV file to import.")
+    parser.add_argument("-t", "--table", choices=list(TABLE_COLUMNS), default="graduates")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="Parse and report, but do not write.")
+    parser.add_argument("-r", "--resume", action="store_true", help="Continue an interrupted import of the same file.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Parser processes (default: CPU count).")
+    parser.add_argument("-b", "--batch-rows", type=int, default=IMPORT_BATCH_ROWS, help="Rows per transaction.")
+    args = parser.parse_args(argv)
+
+    totals = import_roster(args.source, args.table, dry_run=args.dry_run, resume=args.resume,
+                           jobs=args.jobs, batch_rows=args.batch_rows)
+    print(f"{'Dry run' if args.dry_run else 'Import'} complete: {totals['inserted']} new, "
+          f"{totals['updated']} updated, {totals['units']} units.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
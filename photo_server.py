@@ -0,0 +1,117 @@
+import os
+import re
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from photo_store import get_photo, get_thumbnail, THUMBNAIL_SIZES
+
+# Serves stored photos to browsers at stable URLs named by content hash:
+#
+#     GET /photos/<sha256>.jpg          the stored photo
+#     GET /photos/<sha256>_<width>.jpg  a thumbnail (widths in THUMBNAIL_SIZES)
+#
+# A hash always names the same bytes, so responses are marked immutable
+# for a year and carry the hash as ETag. After the first visit a browser
+# shows every photo from its cache without a single request, instead of
+# receiving the bytes again through Streamlit on every rerun.
+#
+# The app starts it in-process when PHOTO_SERVER_PORT is set, or it can run
+# on its own (e.g. behind the same reverse proxy as the app):
+#
+#     python photo_server.py --port 8502
+#
+# PHOTO_BASE_URL is the URL prefix browsers use to reach /photos, e.g.
+# "https://roster.example.org/photos". Photos are only linked by URL when it
+# is set: a default such as http://localhost:<port> would point every remote
+# browser at its own machine. Without it the views embed thumbnails instead.
+
+PHOTO_URL_PATH = re.compile(r"^/photos/([0-9a-f]{64})(?:_(\d+))?\.jpg$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def get_photo_base_url():
+    base_url = os.getenv('PHOTO_BASE_URL')
+    return base_url.rstrip("/") if base_url else None
+
+def get_photo_url(photo_hash, size=None):
+    # Browser URL of a stored photo (or of its thumbnail `size` px wide), or
+    # None if no photo server is configured.
+    base_url = get_photo_base_url()
+    if not base_url or not photo_hash:
+        return None
+    return f"{base_url}/{photo_hash}_{size}.jpg" if size else f"{base_url}/{photo_hash}.jpg"
+
+def get_content_type(data):
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/jpeg"
+
+class PhotoHandler(BaseHTTPRequestHandler):
+    server_version = "RosterPhotos/1.0"
+
+    def do_GET(self):
+        self.send_photo(head=False)
+
+    def do_HEAD(self):
+        self.send_photo(head=True)
+
+    def send_photo(self, head):
+        match = PHOTO_URL_PATH.match(self.path.split("?", 1)[0])
+        if not match:
+            self.send_error(404)
+            return
+        photo_hash = match.group(1)
+        size = int(match.group(2)) if match.group(2) else None
+        if size is not None and size not in THUMBNAIL_SIZES:
+            self.send_error(404)
+            return
+        etag = f'"{photo_hash}_{size}"' if size else f'"{photo_hash}"'
+
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+            self.end_headers()
+            return
+
+        data = get_thumbnail(photo_hash, size) if size else get_photo(photo_hash)
+        if not data:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", get_content_type(data))
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass # One line per photo would drown the app's log
+
+def start_photo_server(host="0.0.0.0", port=None):
+    # Serves photos on a daemon thread; returns the server, or None if
+    # PHOTO_SERVER_PORT is unset (and no port was given).
+    port = port or int(os.getenv('PHOTO_SERVER_PORT', '0'))
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), PhotoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="photo-server", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stored photos with long-lived caching.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv('PHOTO_SERVER_PORT', '8502')))
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), PhotoHandler)
+    print(f"Serving photos on http://{args.host}:{args.port}/photos/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,189 @@
+import os
+import io
+import hashlib
+import tempfile
+from roster_db import get_db_connection
+
+# Content-addressed photo storage. Photo bytes live once in the `photos`
+# table, keyed by their SHA-256; roster rows only hold that hash (e.g.
+# graduates.photo_current_hash), so reading the roster never drags image
+# data along and identical photos are stored once. A photo never changes
+# under its hash, so fetched photos are kept in a local directory of
+# hash-named files and never need invalidating.
+#
+# Everything that reads or writes photos (app.py, the report generators,
+# the exports and the importer) goes through this module.
+
+# Photo column -> column holding its hash, per table
+PHOTO_HASH_COLUMNS = {
+    "graduates": {"photo_1966": "photo_1966_hash", "photo_current": "photo_current_hash"},
+    "memoriam": {"photo": "photo_hash"},
+    "tracked": {"photo": "photo_hash"},
+}
+
+PHOTO_CACHE_DIR = os.getenv('PHOTO_CACHE_DIR') or os.path.join(tempfile.gettempdir(), "roster_photo_cache")
+
+# Widths (px) thumbnails are made at: the display widths used by the views,
+# so the bytes can be shown as they are, without any resizing on the way.
+THUMBNAIL_SIZES = (60, 130, 150, 400)
+THUMBNAIL_QUALITY = 85
+
+def get_hash_column(table_name, column):
+    return PHOTO_HASH_COLUMNS[table_name][column]
+
+def hash_photo(data):
+    return hashlib.sha256(data).hexdigest()
+
+def get_cache_path(photo_hash, size=None):
+    # Two-level tree so no single directory grows too large
+    name = f"{photo_hash}_{size}.jpg" if size else f"{photo_hash}.jpg"
+    return os.path.join(PHOTO_CACHE_DIR, photo_hash[:2], name)
+
+def read_cached_photo(photo_hash, size=None):
+    try:
+        with open(get_cache_path(photo_hash, size), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def write_cached_photo(photo_hash, data, size=None):
+    path = get_cache_path(photo_hash, size)
+    if os.path.exists(path):
+        return path
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temp file per writer: threads (photo server, warm-up,
+        # sessions) may write the same entry at once, and a cache entry
+        # must never be replaced by a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error caching photo {photo_hash}: {e}")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def store_photo(cursor, data):
+    # Stores photo bytes (if not stored yet) and returns their hash, or None
+    # for empty data. Runs in the caller's transaction.
+    if not data:
+        return None
+    photo_hash = hash_photo(data)
+    cursor.execute("INSERT IGNORE INTO photos (hash, data, size_bytes) VALUES (%s, %s, %s)",
+                   (photo_hash, data, len(data)))
+    write_cached_photo(photo_hash, data)
+    return photo_hash
+
+def get_photos(photo_hashes, conn=None):
+    # {hash: bytes} for the given hashes (None entries are ignored): local
+    # cache first, then one query for the rest.
+    photos = {}
+    missing = []
+    for photo_hash in set(h for h in photo_hashes if h):
+        data = read_cached_photo(photo_hash)
+        if data is None:
+            missing.append(photo_hash)
+        else:
+            photos[photo_hash] = data
+    if not missing:
+        return photos
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+        if not conn:
+            return photos
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(missing))
+        cursor.execute(f"SELECT hash, data FROM photos WHERE hash IN ({placeholders})", tuple(missing))
+        for photo_hash, data in cursor.fetchall():
+            data = bytes(data)
+            write_cached_photo(photo_hash, data)
+            photos[photo_hash] = data
+    except Exception as e:
+        print(f"Error fetching photos: {e}")
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+    return photos
+
+def get_photo(photo_hash, conn=None):
+    # Bytes of one photo, or None.
+    if not photo_hash:
+        return None
+    return get_photos([photo_hash], conn).get(photo_hash)
+
+def fetch_photo_batch(conn, table_name, column, ids):
+    # {id: photo bytes} for one photo column of a batch of rows.
+    if not ids:
+        return {}
+    hash_column = get_hash_column(table_name, column)
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"SELECT id, {hash_column} FROM {table_name} WHERE id IN ({placeholders})", tuple(ids))
+        hashes = dict(cursor.fetchall())
+    except Exception as e:
+        print(f"Error fetching photos from {table_name}: {e}")
+        return {}
+    finally:
+        cursor.close()
+    photos = get_photos(hashes.values(), conn)
+    return {row_id: photos.get(photo_hash) for row_id, photo_hash in hashes.items()}
+
+def make_thumbnail(data, size):
+    # JPEG bytes at most `size` px wide (and tall), or None if undecodable.
+    from PIL import Image
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.draft('RGB', (size, size)) # Let the JPEG decoder skip detail we would discard
+        img.thumbnail((size, size))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=THUMBNAIL_QUALITY)
+        return out.getvalue()
+    except Exception:
+        return None
+
+def get_thumbnail(photo_hash, size, conn=None):
+    # Encoded thumbnail bytes of a stored photo. A photo is decoded only the
+    # first time a size is asked for; afterwards the cached file is returned.
+    if not photo_hash:
+        return None
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"Unsupported thumbnail size: {size}")
+    data = read_cached_photo(photo_hash, size)
+    if data is not None:
+        return data
+    photo = get_photo(photo_hash, conn)
+    data = make_thumbnail(photo, size) if photo else None
+    if data:
+        write_cached_photo(photo_hash, data, size)
+    return data
+
+def get_thumbnails(photo_hashes, size, conn=None):
+    # {hash: thumbnail bytes}: cached thumbnails are read as they are, and the
+    # originals of the rest are fetched in one batch.
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"Unsupported thumbnail size: {size}")
+    thumbnails = {}
+    missing = []
+    for photo_hash in set(h for h in photo_hashes if h):
+        data = read_cached_photo(photo_hash, size)
+        if data is None:
+            missing.append(photo_hash)
+        else:
+            thumbnails[photo_hash] = data
+    for photo_hash, photo in get_photos(missing, conn).items():
+        data = make_thumbnail(photo, size)
+        if data:
+            write_cached_photo(photo_hash, data, size)
+            thumbnails[photo_hash] = data
+    return thumbnails
@@ -0,0 +1,151 @@
+import os
+import json
+import tempfile
+import time
+import uuid
+import datetime
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from roster_db import get_db_connection
+
+# Structured metrics for report builds. Each generator run gets a RunMetrics
+# that counts what it did (rows fetched, images processed, cache hits, pages
+# and bytes written) and how long each stage took. Stage times are
+# exclusive: while a nested stage runs the outer one is paused, so the stages
+# of a run add up to its total. Finished runs are appended to a JSON-lines
+# log and stored in the `report_runs` table (see update_schema.py).
+
+REPORT_RUN_LOG = os.getenv('REPORT_RUN_LOG') or os.path.join(tempfile.gettempdir(), "roster_report_logs", "report_runs.jsonl")
+
+# Counters stored as report_runs columns; any others only go to the log.
+RUN_COUNTERS = ("rows_fetched", "images_processed", "cache_hits", "pages", "bytes_written")
+
+def new_build_id():
+    # Groups the runs started by one build_reports() call.
+    return uuid.uuid4().hex
+
+class RunMetrics:
+    def __init__(self, report_name, profile="print", build_id=None):
+        self.report_name = report_name
+        self.profile = profile
+        self.build_id = build_id
+        self.started_at = datetime.datetime.now()
+        self.counters = defaultdict(int)
+        self.stages = defaultdict(float)
+        self.status = None
+        self.total_seconds = None
+        self._started = time.perf_counter()
+        self._stack = []
+        self._mark = self._started
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def _charge(self, now):
+        # Adds the time since the last mark to the innermost open stage
+        if self._stack:
+            self.stages[self._stack[-1]] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def stage(self, name):
+        self._charge(time.perf_counter())
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self._stack.pop()
+
+    def timed(self, iterable, stage_name, counter=None):
+        # Yields from `iterable`, charging the time spent producing each item
+        # (e.g. waiting on the DB) to stage_name and counting items in `counter`.
+        iterator = iter(iterable)
+        while True:
+            with self.stage(stage_name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            if counter:
+                self.count(counter)
+            yield item
+
+    def finish(self, status, filename=None):
+        # Closes the run. Time not charged to any stage is reported as "other".
+        self.status = status
+        self.total_seconds = time.perf_counter() - self._started
+        other = self.total_seconds - sum(self.stages.values())
+        if other > 0:
+            self.stages["other"] += other
+        if filename and os.path.exists(filename):
+            self.counters["bytes_written"] = os.path.getsize(filename)
+        save_run(self)
+        return self
+
+    def to_record(self):
+        return {
+            "build_id": self.build_id,
+            "report_name": self.report_name,
+            "profile": self.profile,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "total_seconds": round(self.total_seconds or 0.0, 3),
+            "counters": dict(self.counters),
+            "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+        }
+
+def stage(metrics, name):
+    # metrics.stage(name), or a no-op when the caller passed no metrics.
+    return metrics.stage(name) if metrics else nullcontext()
+
+def save_run(metrics):
+    record = metrics.to_record()
+    try:
+        os.makedirs(os.path.dirname(REPORT_RUN_LOG) or ".", exist_ok=True)
+        with open(REPORT_RUN_LOG, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"Error writing run log: {e}")
+
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""INSERT INTO report_runs (build_id, report_name, profile, status, started_at, total_seconds,
+                              rows_fetched, images_processed, cache_hits, pages, bytes_written, stages)
+                          VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                       (metrics.build_id, metrics.report_name, metrics.profile, metrics.status, metrics.started_at,
+                        record["total_seconds"], *(metrics.counters.get(name, 0) for name in RUN_COUNTERS),
+                        json.dumps(record["stages"])))
+        conn.commit()
+    except Exception as e:
+        print(f"Error saving run metrics: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_last_build_runs(profile="print"):
+    # Runs of the most recent build_reports() call for `profile`, oldest
+    # first, with `stages` decoded. Throwaway draft builds do not hide the
+    # last stored build. Empty if nothing was recorded yet.
+    conn = get_db_connection()
+    if not conn:
+        return []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""SELECT * FROM report_runs WHERE build_id =
+                              (SELECT build_id FROM report_runs WHERE build_id IS NOT NULL AND profile = %s
+                               ORDER BY id DESC LIMIT 1)
+                          ORDER BY id""", (profile,))
+        runs = cursor.fetchall()
+        for run in runs:
+            run['stages'] = json.loads(run['stages']) if run['stages'] else {}
+        return runs
+    except Exception as e:
+        print(f"Error reading run metrics: {e}")
+        return []
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+from roster_db import get_table_checksums
+from build_reports import build_reports, reports_for_tables, REPORT_SOURCES
+
+# Keeps the stored PDFs fresh without anyone clicking "Generate Latest
+# Reports". A background thread polls a change token (the server-side table
+# checksum) for each source table. Once a table has changed and then stayed
+# quiet for `debounce` seconds, only the reports built from it are rebuilt,
+# off the request path. A steady stream of edits cannot postpone a refresh
+# beyond `max_delay` seconds.
+#
+#     python report_refresher.py        # run in the foreground
+
+WATCHED_TABLES = tuple(sorted({table for tables in REPORT_SOURCES.values() for table in tables}))
+
+class ReportRefresher(threading.Thread):
+    def __init__(self, poll_interval=30, debounce=20, max_delay=300, out_dir=".", jobs=None):
+        super().__init__(name="report-refresher", daemon=True)
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.out_dir = out_dir
+        self.jobs = jobs
+        # Token each table had when its reports were last built. Empty at
+        # start, so the first poll checks everything; reports that are
+        # already current are skipped cheaply by their fingerprints.
+        self.built_tokens = {}
+        # table -> [latest token, time it was first seen, time of first unbuilt change]
+        self.pending = {}
+        self.last_run = None
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def notify(self):
+        # Called after an edit so the change is seen without waiting a full poll.
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def poll(self):
+        # Records changed tables and returns those whose debounce has elapsed.
+        tokens = get_table_checksums(WATCHED_TABLES)
+        if tokens is None:
+            return []
+        now = time.monotonic()
+        for table in WATCHED_TABLES:
+            token = tokens.get(table)
+            if token == self.built_tokens.get(table, object()):
+                self.pending.pop(table, None)
+                continue
+            entry = self.pending.get(table)
+            if entry is None:
+                self.pending[table] = [token, now, now]
+            elif entry[0] != token:
+                # Still changing: restart the quiet period
+                entry[0], entry[1] = token, now
+
+        return [table for table, (token, seen, first) in self.pending.items()
+                if now - seen >= self.debounce or now - first >= self.max_delay]
+
+    def refresh(self, tables):
+        keys = reports_for_tables(tables)
+        print(f"Refreshing reports for changed tables {', '.join(tables)}: {', '.join(keys)}")
+        results = build_reports(keys, out_dir=self.out_dir, jobs=self.jobs)
+        self.last_run = time.time()
+        for table in tables:
+            # Only mark a table built if every report depending on it succeeded;
+            # otherwise it is retried on a later poll.
+            if all(results.get(key, (None,))[0] for key in reports_for_tables([table])):
+                self.built_tokens[table] = self.pending.pop(table)[0]
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                due = self.poll()
+                if due:
+                    self.refresh(due)
+            except Exception as e:
+                print(f"Report refresher error: {e}")
+            # Poll sooner while a change is waiting out its debounce
+            timeout = min(self.poll_interval, self.debounce) if self.pending else self.poll_interval
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+def start_refresher(**kwargs):
+    # Starts a refresher configured from the environment; returns None if
+    # REPORT_REFRESH_INTERVAL is 0 (disabled).
+    interval = int(os.getenv('REPORT_REFRESH_INTERVAL', '30'))
+    if interval <= 0:
+        return None
+    kwargs.setdefault('poll_interval', interval)
+    kwargs.setdefault('debounce', int(os.getenv('REPORT_REFRESH_DEBOUNCE', '20')))
+    refresher = ReportRefresher(**kwargs)
+    refresher.start()
+    return refresher
+
+if __name__ == "__main__":
+    refresher = start_refresher()
+    if refresher:
+        try:
+            while refresher.is_alive():
+                refresher.join(1)
+        except KeyboardInterrupt:
+            refresher.stop()
+    else:
+        print("REPORT_REFRESH_INTERVAL is 0; refresher disabled.")
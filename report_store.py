@@ -0,0 +1,162 @@
+import os
+import hashlib
+import tempfile
+from roster_db import get_db_connection, stream_rows
+
+# Storage for the generated PDFs. The `reports` row holds only metadata
+# (content_hash, size, chunk count, timestamps); the bytes live in
+# `report_chunks`, keyed by content hash, one chunk per row. Writers send a
+# chunk at a time straight from the file on disk, and readers stream the
+# chunks into a local file named by its hash, so no tier ever holds a whole
+# report in memory. A new version is written under its own hash before the
+# metadata row is switched to it, so readers never see a half-written report.
+
+# Bytes per chunk row: well below MySQL's default max_allowed_packet.
+REPORT_CHUNK_SIZE = 1024 * 1024
+
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), "roster_report_cache")
+
+def iter_file_chunks(filename, chunk_size=REPORT_CHUNK_SIZE):
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def write_chunks(cursor, content_hash, chunks):
+    # Inserts chunks for content_hash and returns (chunk count, total bytes).
+    # Leftovers of an interrupted earlier write are cleared first.
+    cursor.execute("DELETE FROM report_chunks WHERE content_hash = %s", (content_hash,))
+    count = size = 0
+    for seq, chunk in enumerate(chunks):
+        cursor.execute("INSERT INTO report_chunks (content_hash, seq, chunk) VALUES (%s, %s, %s)",
+                       (content_hash, seq, chunk))
+        count += 1
+        size += len(chunk)
+    return count, size
+
+def delete_unreferenced_chunks(cursor, content_hash):
+    # Drops the chunks of a replaced version unless another report still uses them.
+    if not content_hash:
+        return
+    cursor.execute("""DELETE FROM report_chunks WHERE content_hash = %s
+                      AND NOT EXISTS (SELECT 1 FROM reports WHERE content_hash = %s)""",
+                   (content_hash, content_hash))
+
+def save_report_file(conn, report_name, filename, content_hash, fingerprint=None):
+    # Stores `filename` under report_name in one transaction. Returns False
+    # if the same bytes were already stored (only the fingerprint is updated).
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT content_hash, chunk_count FROM reports WHERE report_name = %s", (report_name,))
+        row = cursor.fetchone()
+        old_hash = row[0] if row else None
+        if old_hash == content_hash and row[1]:
+            cursor.execute("UPDATE reports SET data_fingerprint=%s WHERE report_name=%s",
+                           (fingerprint, report_name))
+            conn.commit()
+            return False
+
+        chunk_count, size_bytes = write_chunks(cursor, content_hash, iter_file_chunks(filename))
+        cursor.execute("""INSERT INTO reports (report_name, file_data, content_hash, data_fingerprint, size_bytes, chunk_count)
+                          VALUES (%s, NULL, %s, %s, %s, %s)
+                          ON DUPLICATE KEY UPDATE file_data=NULL, content_hash=VALUES(content_hash),
+                              data_fingerprint=VALUES(data_fingerprint), size_bytes=VALUES(size_bytes),
+                              chunk_count=VALUES(chunk_count), created_at=NOW()""",
+                       (report_name, content_hash, fingerprint, size_bytes, chunk_count))
+        if old_hash != content_hash:
+            delete_unreferenced_chunks(cursor, old_hash)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def get_report_info(report_name):
+    # (content_hash, created_at, size_bytes) for report_name, or (None, None, None).
+    conn = get_db_connection()
+    if not conn:
+        return None, None, None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT content_hash, created_at, size_bytes FROM reports WHERE report_name = %s AND chunk_count > 0",
+                       (report_name,))
+        row = cursor.fetchone()
+        return tuple(row) if row else (None, None, None)
+    except Exception as e:
+        print(f"Error reading report info for {report_name}: {e}")
+        return None, None, None
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_cached_report_path(content_hash):
+    return os.path.join(REPORT_CACHE_DIR, f"{content_hash}.pdf")
+
+def evict_cached_reports(conn, keep=()):
+    # Removes cached files of report versions no longer referenced by
+    # `reports`, so each rebuild does not leave another full copy behind.
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT content_hash FROM reports WHERE content_hash IS NOT NULL")
+        referenced = {h for (h,) in cursor.fetchall()} | set(keep)
+    except Exception as e:
+        print(f"Error listing stored reports: {e}")
+        return
+    finally:
+        cursor.close()
+    for name in os.listdir(REPORT_CACHE_DIR):
+        if name.endswith(".pdf") and name[:-len(".pdf")] not in referenced:
+            try:
+                os.remove(os.path.join(REPORT_CACHE_DIR, name))
+            except OSError:
+                pass
+
+def fetch_report_file(content_hash):
+    # Local path holding the report with content_hash, streaming it from the
+    # DB one chunk at a time on first use. Returns None on failure or if the
+    # streamed bytes do not match the hash.
+    path = get_cached_report_path(content_hash)
+    if os.path.exists(path):
+        return path
+
+    conn = get_db_connection(consume_results=True)
+    if not conn:
+        return None
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=REPORT_CACHE_DIR, suffix=".part")
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as f:
+            rows = stream_rows(conn, "SELECT chunk FROM report_chunks WHERE content_hash = %s ORDER BY seq",
+                               (content_hash,), chunk_size=1)
+            for row in rows:
+                f.write(row['chunk'])
+                digest.update(row['chunk'])
+        if digest.hexdigest() != content_hash:
+            print(f"Stored report {content_hash} is incomplete or corrupt.")
+            return None
+        os.replace(tmp_path, path)
+        evict_cached_reports(conn, keep=(content_hash,))
+        return path
+    except Exception as e:
+        print(f"Error fetching report {content_hash}: {e}")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn.close()
+
+def open_report(report_name):
+    # (open binary file, created_at) for the stored report, or (None, None).
+    # The caller closes the file.
+    content_hash, created_at, _ = get_report_info(report_name)
+    if not content_hash:
+        return None, None
+    path = fetch_report_file(content_hash)
+    if not path:
+        return None, None
+    return open(path, 'rb'), created_at
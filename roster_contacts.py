@@ -0,0 +1,173 @@
+import io
+import re
+import csv
+import sys
+import base64
+import argparse
+import tempfile
+import zipfile
+from roster_db import get_db_connection, stream_rows, iter_batches
+from photo_store import get_thumbnails
+from roster_export import build_export_query
+
+# "Download contacts": a ZIP with one vCard per graduate (thumbnail photo
+# embedded) plus index.csv. The roster is read from an unbuffered cursor,
+# photos are fetched a batch at a time on a second connection, and the
+# archive is written to a non-seekable sink and handed out entry by entry,
+# so neither the photos nor the archive are ever held in memory whole.
+#
+#     python roster_contacts.py -o contacts.zip
+#     python roster_contacts.py -b "Electrical Engineering" > ee_contacts.zip
+
+CONTACT_COLUMNS = ("id", "name", "roll_no", "branch", "email", "phone", "lives_in", "state", "country",
+                   "photo_current_hash")
+INDEX_COLUMNS = ("file", "name", "roll_no", "branch", "email", "phone", "lives_in", "state", "country", "has_photo")
+
+# vCard photos are the photo store's card-size thumbnails (one of
+# photo_store.THUMBNAIL_SIZES), so they come from, and fill, the same cache
+CONTACT_PHOTO_PX = 150
+CONTACT_BATCH_SIZE = 50
+
+VCARD_ORG = "IIT Madras, Class of 1971"
+
+class ChunkSink(io.RawIOBase):
+    # Write-only, non-seekable stream collecting what zipfile writes until
+    # drained. zipfile falls back to data descriptors when it cannot seek.
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def escape_vcard(value):
+    value = str(value or "")
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+                 .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def fold_line(line):
+    # vCard lines are folded at 75 octets with CRLF + space.
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1 # Do not split a UTF-8 sequence
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+    return "\r\n ".join(parts)
+
+def make_vcard(row, photo):
+    lines = [
+        "BEGIN:VCARD",
+        "VERSION:3.0",
+        f"FN:{escape_vcard(row['name'])}",
+        f"N:;{escape_vcard(row['name'])};;;",
+        f"ORG:{escape_vcard(VCARD_ORG)}",
+    ]
+    note = [f"Roll No: {row['roll_no']}" if row['roll_no'] else "", row['branch'] or ""]
+    if any(note):
+        lines.append(f"NOTE:{escape_vcard(' - '.join(n for n in note if n))}")
+    if row['email']:
+        lines.append(f"EMAIL;TYPE=INTERNET:{escape_vcard(row['email'])}")
+    if row['phone']:
+        lines.append(f"TEL;TYPE=CELL:{escape_vcard(row['phone'])}")
+    if row['lives_in'] or row['state'] or row['country']:
+        lines.append("ADR;TYPE=HOME:;;;" + ";".join(escape_vcard(row[c]) for c in ("lives_in", "state")) + ";;"
+                     + escape_vcard(row['country']))
+    if photo:
+        lines.append("PHOTO;ENCODING=b;TYPE=JPEG:" + base64.b64encode(photo).decode("ascii"))
+    lines.append("END:VCARD")
+    return "\r\n".join(fold_line(line) for line in lines) + "\r\n"
+
+def get_vcard_filename(row, used):
+    base = re.sub(r"[^\w\-. ]+", "", f"{row['name'] or 'Unknown'} {row['roll_no'] or ''}").strip() or str(row['id'])
+    name = f"{base}.vcf"
+    if name in used:
+        name = f"{base} ({row['id']}).vcf"
+    used.add(name)
+    return name
+
+def iter_contacts_zip(branch=None, search=None, counter=None):
+    # Yields the ZIP archive as byte chunks, one or more per vCard batch.
+    # `counter`, if given, is a dict whose "count" is set to the cards written.
+    conn = get_db_connection(consume_results=True)
+    photo_conn = get_db_connection()
+    if not conn or not photo_conn:
+        for c in (conn, photo_conn):
+            if c: c.close()
+        raise ConnectionError("Failed to connect to the database.")
+
+    sink = ChunkSink()
+    # The index is spooled to disk past 1 MB rather than kept in memory
+    index_file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="", encoding="utf-8")
+    index = csv.writer(index_file)
+    index.writerow(INDEX_COLUMNS)
+    used_names = set()
+    count = 0
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            query, params = build_export_query(CONTACT_COLUMNS, branch, search)
+            for batch in iter_batches(stream_rows(conn, query, params), CONTACT_BATCH_SIZE):
+                # Cached thumbnails are read as they are; the originals of the
+                # rest are fetched in one query and thumbnailed once
+                thumbnails = get_thumbnails([row['photo_current_hash'] for row in batch], CONTACT_PHOTO_PX, photo_conn)
+                for row in batch:
+                    photo = thumbnails.get(row['photo_current_hash'])
+                    filename = get_vcard_filename(row, used_names)
+                    zf.writestr(filename, make_vcard(row, photo))
+                    index.writerow([filename] + [row[c] or "" for c in INDEX_COLUMNS[1:-1]] + ["yes" if photo else "no"])
+                    count += 1
+                yield sink.drain()
+
+            index_file.seek(0)
+            with zf.open("index.csv", "w") as entry:
+                for line in index_file:
+                    entry.write(line.encode("utf-8"))
+                    if sum(len(c) for c in sink.chunks) >= 64 * 1024:
+                        yield sink.drain()
+        yield sink.drain() # Central directory
+        if counter is not None:
+            counter["count"] = count
+    finally:
+        index_file.close()
+        conn.close()
+        photo_conn.close()
+
+def export_contacts(out, branch=None, search=None):
+    # Writes the contacts ZIP to the binary file object `out`; returns the card count.
+    counter = {}
+    for chunk in iter_contacts_zip(branch, search, counter):
+        if chunk:
+            out.write(chunk)
+    return counter.get("count", 0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the roster as a ZIP of vCards.")
+    parser.add_argument("-o", "--output", help="Output ZIP file (default: stdout).")
+    parser.add_argument("-b", "--branch", help="Only this branch.")
+    parser.add_argument("-s", "--search", help="Only names or roll numbers containing this text.")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, "wb") as out:
+            count = export_contacts(out, args.branch, args.search)
+    else:
+        count = export_contacts(sys.stdout.buffer, args.branch, args.search)
+    print(f"Exported {count} contacts.", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import pandas as pd
+from roster_db import get_db_connection, DATE_PART_COLUMNS
+
+# The roster as the app holds it: one compact DataFrame per data version,
+# shared by every session of a server process. Low-cardinality columns are
+# categoricals (one small code per row instead of a Python string), the rest
+# are pyarrow-backed strings, and photos are only referenced by hash (see
+# photo_store). Filters, sorts and the Statistics group-by then work on codes
+# and arrow buffers instead of per-row Python objects.
+#
+# Missing values are stored as "" rather than NA, so the views can keep
+# testing cells for truthiness (`if row['email']:`). The month/day columns
+# derived from dob and wad (see roster_db.parse_month_day) are small
+# integers, 0 where unknown.
+#
+# Each version is also written to a parquet file, so a restarted process can
+# load it without querying the DB when the data has not changed.
+
+CATEGORY_COLUMNS = ('branch', 'hostel', 'state', 'country', 'lives_in')
+TEXT_COLUMNS = ('name', 'roll_no', 'dob', 'wad', 'spouse_name', 'email', 'phone',
+                'photo_1966_hash', 'photo_current_hash')
+DATE_COLUMNS = tuple(c for columns in DATE_PART_COLUMNS.values() for c in columns)
+ROSTER_COLUMNS = ('id',) + TEXT_COLUMNS[:2] + CATEGORY_COLUMNS + TEXT_COLUMNS[2:] + DATE_COLUMNS
+
+# Bump when ROSTER_COLUMNS or their dtypes change, so stale cache files are ignored
+ROSTER_CACHE_FORMAT = 3
+
+ROSTER_CACHE_DIR = os.getenv('ROSTER_CACHE_DIR') or os.path.join(tempfile.gettempdir(), "roster_data_cache")
+
+# Data versions kept in memory; older ones are dropped.
+MAX_CACHED_VERSIONS = 2
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def get_string_dtype():
+    try:
+        import pyarrow # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return pd.StringDtype()
+
+def load_roster_rows():
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Failed to connect to the database.")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(ROSTER_COLUMNS)} FROM graduates")
+        return pd.DataFrame(cursor.fetchall(), columns=list(ROSTER_COLUMNS))
+    finally:
+        cursor.close()
+        conn.close()
+
+def compact_roster(df):
+    # Compact copy of a raw roster frame (object columns, None for missing).
+    compact = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    # int64 like the DB ids, whatever the table size, so comparisons, merges
+    # and ids passed back to SQL keep one type
+    compact['id'] = pd.to_numeric(df['id'].to_numpy()).astype('int64')
+    string_dtype = get_string_dtype()
+    for column in DATE_COLUMNS:
+        compact[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int8')
+    for column in TEXT_COLUMNS + CATEGORY_COLUMNS:
+        values = df[column].to_numpy(dtype=object)
+        values = pd.Series(values).fillna("").astype(str)
+        if column in CATEGORY_COLUMNS:
+            # Sorted categories with "" last, so sorting by a category column
+            # orders rows alphabetically with blanks at the end
+            present = sorted(v for v in values.unique() if v)
+            compact[column] = pd.Categorical(values, categories=present + [""])
+        else:
+            compact[column] = values.astype(string_dtype)
+    return compact[list(ROSTER_COLUMNS)]
+
+def get_cache_path(version):
+    return os.path.join(ROSTER_CACHE_DIR, f"roster_{ROSTER_CACHE_FORMAT}_{version}.parquet")
+
+def read_cached_roster(version):
+    try:
+        return pd.read_parquet(get_cache_path(version))
+    except Exception:
+        return None
+
+def write_cached_roster(version, df):
+    path = get_cache_path(version)
+    tmp_path = None
+    try:
+        os.makedirs(ROSTER_CACHE_DIR, exist_ok=True)
+        # Unique per writer: the warm-up thread and sessions may write at once
+        fd, tmp_path = tempfile.mkstemp(dir=ROSTER_CACHE_DIR, suffix=".part")
+        with os.fdopen(fd, 'wb') as f:
+            df.to_parquet(f, index=False)
+        os.replace(tmp_path, path)
+        # Only the current version is worth keeping on disk
+        for name in os.listdir(ROSTER_CACHE_DIR):
+            if name.endswith(".parquet") and name != os.path.basename(path):
+                os.remove(os.path.join(ROSTER_CACHE_DIR, name))
+    except Exception as e:
+        print(f"Error caching roster: {e}")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def get_roster(version):
+    # The compact roster for data version `version` (see
+    # roster_db.get_data_version), loaded at most once per version and
+    # process. Take the version before calling, so a concurrent edit can only
+    # make the cached entry look older than it is, never newer. The frame is
+    # shared: filter or copy it, never modify it in place.
+    if version:
+        with _cache_lock:
+            if version in _cache:
+                return _cache[version]
+        df = read_cached_roster(version)
+    else:
+        df = None
+
+    if df is None:
+        df = compact_roster(load_roster_rows())
+        if version:
+            write_cached_roster(version, df)
+
+    if version:
+        with _cache_lock:
+            _cache[version] = df
+            while len(_cache) > MAX_CACHED_VERSIONS:
+                _cache.pop(next(iter(_cache)))
+    return df
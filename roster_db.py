@@ -0,0 +1,148 @@
+import os
+import re
+import hashlib
+import datetime
+import mysql.connector
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Database helpers shared by the app, the report generators and the
+# statistics engine. Kept free of heavy imports so any module can use it.
+
+def get_db_connection(**kwargs):
+    try:
+        return mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME'),
+            **kwargs
+        )
+    except mysql.connector.Error as err:
+        print(f"Error connecting to DB: {err}")
+        return None
+
+# Hot queries of the app and the report generators. Their callers run them
+# from here, and update_schema.py EXPLAINs exactly these strings, so the
+# plan check always sees the SQL that is actually executed.
+#
+# Text columns the generators need; photos are fetched separately by id
+# through photo_store, so streaming the roster never drags image data along.
+GRADUATE_TEXT_COLUMNS = "id, name, roll_no, branch, hostel, dob, wad, spouse_name, lives_in, state, country, email, phone"
+PERSON_TEXT_COLUMNS = "id, name, roll_no, branch"
+
+LOGIN_QUERY = "SELECT name, roll_no FROM graduates WHERE roll_no = %s"
+LOGOUT_QUERY = "UPDATE user_logs SET logout_time = %s WHERE id = %s"
+POSTS_QUERY = "SELECT * FROM posts ORDER BY created_at DESC"
+GRADUATES_BY_BRANCH_QUERY = f"SELECT {GRADUATE_TEXT_COLUMNS} FROM graduates ORDER BY branch, name"
+MEMORIAM_REPORT_QUERY = f"SELECT {PERSON_TEXT_COLUMNS} FROM memoriam ORDER BY name"
+MISSING_REPORT_QUERY = f"SELECT {PERSON_TEXT_COLUMNS} FROM tracked ORDER BY branch, name"
+MEMORIAM_WALL_QUERY = "SELECT id, name, roll_no, branch, photo_hash FROM memoriam ORDER BY name"
+MISSING_WALL_QUERY = "SELECT id, name, roll_no, branch, photo_hash FROM tracked ORDER BY name"
+
+# Rows held in memory at once while streaming a query.
+ROW_CHUNK_SIZE = 200
+
+def stream_rows(conn, query, params=(), chunk_size=ROW_CHUNK_SIZE):
+    # Yields rows from an unbuffered cursor, fetching chunk_size rows at a time.
+    # The connection is busy until the generator is exhausted, so open it
+    # with consume_results=True and use a second connection for other queries.
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params)
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield from chunk
+    finally:
+        cursor.close()
+
+def iter_batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def get_table_checksums(tables):
+    # {table: checksum} for `tables`, or None if the DB is unreachable.
+    # CHECKSUM TABLE is computed by the server, so no row data crosses the wire.
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CHECKSUM TABLE {', '.join(tables)}")
+        # Table names come back qualified with the database name
+        return {str(name).split('.')[-1]: checksum for name, checksum in cursor.fetchall()}
+    except Exception as e:
+        print(f"Error computing table checksums: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_data_version(tables):
+    # Version token for the contents of `tables`: changes whenever a row does.
+    checksums = get_table_checksums(tables)
+    if checksums is None:
+        return None
+
+    digest = hashlib.sha256()
+    for table_name in sorted(checksums):
+        digest.update(f"{table_name}:{checksums[table_name]};".encode())
+    return digest.hexdigest()
+
+MONTH_ABBRS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+MONTH_NUMBERS = {abbr.lower(): i for i, abbr in enumerate(MONTH_ABBRS, 1)}
+
+# Free-text date column -> (month column, day column) derived from it
+DATE_PART_COLUMNS = {
+    "dob": ("dob_month", "dob_day"),
+    "wad": ("wad_month", "wad_day"),
+}
+
+def parse_month_day(value):
+    # (month, day) of a free-text date such as "12-Jun", "7 May", "June 12",
+    # "12-Jun-1950", "1950-06-12" or "12/06/1950" (day first). An empty value
+    # gives (None, None); text that cannot be read gives (0, 0), and a
+    # missing day 0. The only parser of these columns: its result is stored
+    # when a date is written, and readers use the stored columns.
+    if value is None:
+        return None, None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.month, value.day
+    text = str(value).strip()
+    if not text:
+        return None, None
+
+    numbers = re.findall(r"\d+", text)
+    words = re.findall(r"[A-Za-z]{3,}", text)
+    if words:
+        month = next((MONTH_NUMBERS[w[:3].lower()] for w in words if w[:3].lower() in MONTH_NUMBERS), 0)
+        days = [int(n) for n in numbers if len(n) <= 2 and 1 <= int(n) <= 31]
+        day = days[0] if days else 0
+    elif len(numbers) == 3 and len(numbers[0]) == 4:
+        month, day = int(numbers[1]), int(numbers[2])
+    elif len(numbers) in (2, 3):
+        day, month = int(numbers[0]), int(numbers[1])
+    else:
+        return 0, 0
+
+    if not 1 <= month <= 12 or not 0 <= day <= 31:
+        return 0, 0
+    return month, day
+
+def get_date_parts(record):
+    # {month column: month, day column: day} for the date fields in `record`.
+    parts = {}
+    for field, (month_column, day_column) in DATE_PART_COLUMNS.items():
+        if field in record:
+            parts[month_column], parts[day_column] = parse_month_day(record[field])
+    return parts
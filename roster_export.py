@@ -0,0 +1,161 @@
+import io
+import sys
+import csv
+import json
+import argparse
+import datetime
+from roster_db import get_db_connection, stream_rows
+
+# Spreadsheet exports of the roster. Rows are streamed from the DB with only
+# the requested text columns (never the photo BLOBs) and passed through a
+# generator pipeline straight into the writer, so memory use does not grow
+# with the number of rows. CSV and JSON lines are produced as byte chunks
+# that can be sent as they are made; XLSX uses openpyxl's write-only mode.
+#
+#     python roster_export.py -f csv > roster.csv
+#     python roster_export.py -f xlsx -o roster.xlsx -c name branch email -b "Mechanical Engineering"
+#     python roster_export.py -f jsonl -s kumar
+
+# Exportable columns, in their default order
+EXPORT_COLUMNS = ("name", "roll_no", "branch", "hostel", "dob", "wad", "spouse_name",
+                  "lives_in", "state", "country", "email", "phone")
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+}
+
+# Rows per chunk when a text export is produced as byte chunks
+EXPORT_CHUNK_ROWS = 500
+
+def get_export_columns(columns=None):
+    # Validated column projection; unknown names are rejected rather than
+    # interpolated into SQL.
+    if not columns:
+        return list(EXPORT_COLUMNS)
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export column(s): {', '.join(unknown)}")
+    return list(columns)
+
+def build_export_query(columns, branch=None, search=None):
+    # Same filters as the sidebar: exact branch, and name or roll number
+    # containing `search` (case-insensitive under the default collation).
+    conditions = []
+    params = []
+    if branch and branch != "All":
+        conditions.append("branch = %s")
+        params.append(branch)
+    if search:
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        conditions.append("(name LIKE %s OR roll_no LIKE %s)")
+        params += [pattern, pattern]
+    query = f"SELECT {', '.join(columns)} FROM graduates"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + " ORDER BY branch, name", tuple(params)
+
+def iter_export_rows(columns, branch=None, search=None):
+    # Yields one dict per matching graduate, fetched in chunks.
+    conn = get_db_connection(consume_results=True)
+    if not conn:
+        raise ConnectionError("Failed to connect to the database.")
+    try:
+        query, params = build_export_query(columns, branch, search)
+        yield from stream_rows(conn, query, params)
+    finally:
+        conn.close()
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+def iter_csv_chunks(rows, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    # UTF-8 CSV as byte chunks, with a BOM so Excel detects the encoding.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    first = True
+    for row in rows:
+        writer.writerow([format_value(row[c]) for c in columns])
+        pending += 1
+        if pending == chunk_rows:
+            yield buffer.getvalue().encode("utf-8-sig" if first else "utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+            first = False
+    if pending or first:
+        yield buffer.getvalue().encode("utf-8-sig" if first else "utf-8")
+
+def iter_jsonl_chunks(rows, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({c: format_value(row[c]) for c in columns}, ensure_ascii=False))
+        if len(lines) == chunk_rows:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def write_xlsx(rows, columns, out):
+    # out: path or binary file object. openpyxl's write-only workbook streams
+    # rows to disk instead of building the sheet in memory.
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Graduates")
+    ws.append(columns)
+    for row in rows:
+        ws.append([format_value(row[c]) for c in columns])
+    wb.save(out)
+
+def export_roster(fmt, out, columns=None, branch=None, search=None):
+    # Writes the export to `out` (a binary file object, or for xlsx also a
+    # path) and returns the number of rows written.
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    columns = get_export_columns(columns)
+    count = 0
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    rows = counted(iter_export_rows(columns, branch, search))
+    if fmt == "xlsx":
+        write_xlsx(rows, columns, out)
+    else:
+        chunks = iter_csv_chunks(rows, columns) if fmt == "csv" else iter_jsonl_chunks(rows, columns)
+        for chunk in chunks:
+            out.write(chunk)
+            out.flush()
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the graduates roster.")
+    parser.add_argument("-f", "--format", choices=list(EXPORT_FORMATS), default="csv")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout; required for xlsx).")
+    parser.add_argument("-c", "--columns", nargs="+", choices=EXPORT_COLUMNS, help="Columns to export (default: all).")
+    parser.add_argument("-b", "--branch", help="Only this branch.")
+    parser.add_argument("-s", "--search", help="Only names or roll numbers containing this text.")
+    args = parser.parse_args(argv)
+
+    if args.format == "xlsx" and not args.output:
+        parser.error("xlsx export needs --output")
+
+    if args.output:
+        with open(args.output, "wb") as out:
+            count = export_roster(args.format, out, args.columns, args.branch, args.search)
+    else:
+        count = export_roster(args.format, sys.stdout.buffer, args.columns, args.branch, args.search)
+    print(f"Exported {count} rows.", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+import threading
+import pandas as pd
+from roster_db import get_db_connection, get_data_version, MONTH_ABBRS
+
+# Statistics engine shared by the Statistics view in app.py and the text
+# roster PDF. All distributions come from one vectorized group-by over a
+# snapshot of the roster and are cached per data version, so whichever
+# surface asks first pays for the computation and the other reuses it.
+
+CATEGORY_FIELDS = ('branch', 'hostel', 'country', 'state', 'lives_in')
+# Months derived from dob and wad when they are written (see roster_db.parse_month_day)
+MONTH_FIELDS = ('dob_month', 'wad_month')
+MONTH_LABELS = dict(enumerate(MONTH_ABBRS, 1))
+STATS_COLUMNS = CATEGORY_FIELDS + MONTH_FIELDS
+
+# Data versions kept in the cache; older ones are dropped.
+MAX_CACHED_VERSIONS = 4
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def load_stats_snapshot():
+    # Only the columns the statistics need, never the photo BLOBs.
+    conn = get_db_connection()
+    if not conn:
+        return pd.DataFrame(columns=list(STATS_COLUMNS))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(STATS_COLUMNS)} FROM graduates")
+        return pd.DataFrame(cursor.fetchall(), columns=list(STATS_COLUMNS))
+    finally:
+        cursor.close()
+        conn.close()
+
+def compute_distributions(snapshot):
+    # Returns {name: {category: count}} for every category field plus
+    # dob_month and wad_month, each ordered by count descending.
+    columns = {}
+    for field in CATEGORY_FIELDS:
+        if field in snapshot.columns:
+            columns[field] = snapshot[field].astype("object")
+    for field in MONTH_FIELDS:
+        if field in snapshot.columns:
+            # 0 / NULL (unknown month) map to NA and are dropped below
+            columns[field] = pd.to_numeric(snapshot[field], errors='coerce').map(MONTH_LABELS)
+
+    if not columns:
+        return {}
+
+    stacked = pd.DataFrame(columns).melt(var_name='field', value_name='value')
+    stacked = stacked[stacked['value'].notna() & (stacked['value'] != "")]
+    counts = stacked.groupby(['field', 'value'], sort=False).size()
+
+    distributions = {name: {} for name in columns}
+    for (name, value), count in counts.sort_values(ascending=False, kind='stable').items():
+        distributions[name][value] = int(count)
+    return distributions
+
+def get_distributions(snapshot=None, version=None):
+    # Distributions for the given data version, computed at most once per
+    # version. `snapshot` is used if the version is not cached yet; otherwise
+    # a minimal snapshot is loaded. Callers that already hold the roster should
+    # take `version` before loading it, so a concurrent edit can only make the
+    # cached entry look older than it is, never newer.
+    if version is None:
+        version = get_data_version(("graduates",))
+    if version:
+        with _cache_lock:
+            if version in _cache:
+                return _cache[version]
+
+    if snapshot is None:
+        snapshot = load_stats_snapshot()
+    distributions = compute_distributions(snapshot)
+
+    if version:
+        with _cache_lock:
+            _cache[version] = distributions
+            while len(_cache) > MAX_CACHED_VERSIONS:
+                _cache.pop(next(iter(_cache)))
+    return distributions
+
+def get_cached_distributions():
+    # {data version: distributions} cached in this process, to hand to
+    # report worker processes (see build_reports).
+    with _cache_lock:
+        return dict(_cache)
+
+def add_cached_distributions(cached):
+    # Seeds this process's cache with distributions computed elsewhere, so a
+    # freshly spawned report worker does not recompute them.
+    with _cache_lock:
+        for version, distributions in cached.items():
+            _cache.setdefault(version, distributions)
+        while len(_cache) > MAX_CACHED_VERSIONS:
+            _cache.pop(next(iter(_cache)))
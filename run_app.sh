@@ -1,2 +1,4 @@
 #!/bin/bash
+# Fill the shared caches before the first visitor arrives (see warmup.py)
+python warmup.py || true
 streamlit run app.py
@@ -0,0 +1,319 @@
+import os
+import sys
+import hashlib
+import argparse
+import mysql.connector
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Schema migrations for the roster database. Every step is idempotent, so the
+# script can be re-run safely after each deploy:
+#     python update_schema.py
+#     python update_schema.py --check    # only verify the hot queries' plans
+
+def get_db_connection():
+    try:
+        return mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME')
+        )
+    except mysql.connector.Error as err:
+        print(f"Error connecting to DB: {err}")
+        return None
+
+def column_exists(cursor, table_name, column_name):
+    cursor.execute(f"SHOW COLUMNS FROM {table_name} LIKE %s", (column_name,))
+    found = cursor.fetchone() is not None
+    cursor.fetchall() # Consume rest
+    return found
+
+def add_column(cursor, table_name, column_name, definition):
+    if column_exists(cursor, table_name, column_name):
+        print(f"  {table_name}.{column_name} already exists.")
+        return
+    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}")
+    print(f"  Added {table_name}.{column_name}.")
+
+def update_reports_table(cursor):
+    # content_hash: SHA-256 of the stored PDF, so identical bytes are not re-uploaded.
+    # data_fingerprint: fingerprint of the source tables the PDF was built from.
+    print("Updating reports table...")
+    add_column(cursor, "reports", "content_hash", "CHAR(64) NULL")
+    add_column(cursor, "reports", "data_fingerprint", "CHAR(64) NULL")
+
+def create_report_chunks_table(cursor):
+    # Report bytes, one chunk per row, keyed by content hash (see report_store).
+    print("Creating report_chunks table...")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS report_chunks (
+                          content_hash CHAR(64) NOT NULL,
+                          seq INT NOT NULL,
+                          chunk MEDIUMBLOB NOT NULL,
+                          PRIMARY KEY (content_hash, seq)
+                      )""")
+    add_column(cursor, "reports", "size_bytes", "BIGINT NULL")
+    add_column(cursor, "reports", "chunk_count", "INT NOT NULL DEFAULT 0")
+    # New reports are stored in report_chunks only
+    cursor.execute("ALTER TABLE reports MODIFY file_data LONGBLOB NULL")
+
+def move_report_blobs_to_chunks(cursor):
+    # Moves reports still stored inline in reports.file_data into
+    # report_chunks, one report at a time.
+    from report_store import REPORT_CHUNK_SIZE, write_chunks
+    print("Moving stored reports into report_chunks...")
+    cursor.execute("SELECT report_name FROM reports WHERE file_data IS NOT NULL")
+    names = [row[0] for row in cursor.fetchall()]
+    for report_name in names:
+        cursor.execute("SELECT file_data FROM reports WHERE report_name = %s", (report_name,))
+        file_data = cursor.fetchone()[0]
+        content_hash = hashlib.sha256(file_data).hexdigest()
+        chunks = (file_data[i:i + REPORT_CHUNK_SIZE] for i in range(0, len(file_data), REPORT_CHUNK_SIZE))
+        chunk_count, size_bytes = write_chunks(cursor, content_hash, chunks)
+        cursor.execute("""UPDATE reports SET file_data=NULL, content_hash=%s, size_bytes=%s, chunk_count=%s
+                          WHERE report_name=%s""", (content_hash, size_bytes, chunk_count, report_name))
+        del file_data
+        print(f"  Moved {report_name} ({size_bytes} bytes, {chunk_count} chunks).")
+
+def create_report_runs_table(cursor):
+    # One row per report generator run (see report_metrics).
+    print("Creating report_runs table...")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS report_runs (
+                          id INT AUTO_INCREMENT PRIMARY KEY,
+                          build_id CHAR(32) NULL,
+                          report_name VARCHAR(255) NOT NULL,
+                          profile VARCHAR(20) NOT NULL,
+                          status VARCHAR(20) NOT NULL,
+                          started_at DATETIME(3) NOT NULL,
+                          total_seconds DOUBLE NOT NULL,
+                          rows_fetched INT NOT NULL DEFAULT 0,
+                          images_processed INT NOT NULL DEFAULT 0,
+                          cache_hits INT NOT NULL DEFAULT 0,
+                          pages INT NOT NULL DEFAULT 0,
+                          bytes_written BIGINT NOT NULL DEFAULT 0,
+                          stages TEXT NULL,
+                          KEY idx_report_runs_build (build_id),
+                          KEY idx_report_runs_report (report_name, started_at)
+                      )""")
+
+def create_photos_table(cursor):
+    # Content-addressed photo store (see photo_store) and the hash columns
+    # that replace the photo BLOBs in the roster rows.
+    from photo_store import PHOTO_HASH_COLUMNS
+    print("Creating photos table...")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS photos (
+                          hash CHAR(64) NOT NULL PRIMARY KEY,
+                          data MEDIUMBLOB NOT NULL,
+                          size_bytes INT NOT NULL,
+                          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                      )""")
+    for table_name, columns in PHOTO_HASH_COLUMNS.items():
+        for hash_column in columns.values():
+            add_column(cursor, table_name, hash_column, "CHAR(64) NULL")
+
+# Rows whose photos are moved per query
+PHOTO_MOVE_BATCH = 50
+
+def move_photos_to_store(cursor):
+    # Copies every photo BLOB into `photos`, records its hash on the row and
+    # clears the BLOB, a batch of rows at a time. Re-running only picks up
+    # rows that still hold a BLOB.
+    from photo_store import PHOTO_HASH_COLUMNS, store_photo
+    print("Moving photos into the photo store...")
+    for table_name, columns in PHOTO_HASH_COLUMNS.items():
+        for column, hash_column in columns.items():
+            moved = 0
+            while True:
+                cursor.execute(f"SELECT id, {column} FROM {table_name} WHERE {column} IS NOT NULL LIMIT {PHOTO_MOVE_BATCH}")
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                for row_id, data in rows:
+                    photo_hash = store_photo(cursor, bytes(data)) if data else None
+                    cursor.execute(f"UPDATE {table_name} SET {hash_column}=%s, {column}=NULL WHERE id=%s",
+                                   (photo_hash, row_id))
+                moved += len(rows)
+            print(f"  {table_name}.{column}: moved {moved} photos.")
+
+# Indexes the hot queries rely on: (table, index name, columns)
+QUERY_INDEXES = [
+    ("graduates", "idx_graduates_roll_no", ("roll_no",)),           # login, edits, import matching
+    ("graduates", "idx_graduates_branch_name", ("branch", "name")), # reports, exports
+    ("memoriam", "idx_memoriam_name", ("name",)),
+    ("tracked", "idx_tracked_name", ("name",)),
+    ("tracked", "idx_tracked_branch_name", ("branch", "name")),
+    ("posts", "idx_posts_created_at", ("created_at",)),
+]
+
+# Prefix indexed on TEXT columns (which cannot be indexed whole). A prefix
+# index serves lookups but not ORDER BY, which check_query_plans reports.
+TEXT_INDEX_PREFIX = 100
+
+def index_exists(cursor, table_name, index_name):
+    cursor.execute(f"SHOW INDEX FROM {table_name} WHERE Key_name = %s", (index_name,))
+    return bool(cursor.fetchall())
+
+def get_index_part(cursor, table_name, column_name):
+    cursor.execute(f"SHOW COLUMNS FROM {table_name} LIKE %s", (column_name,))
+    row = cursor.fetchone()
+    cursor.fetchall()
+    column_type = str(row[1]).lower() if row else ""
+    if "text" in column_type or "blob" in column_type:
+        return f"{column_name}({TEXT_INDEX_PREFIX})"
+    return column_name
+
+def add_index(cursor, table_name, index_name, columns):
+    if index_exists(cursor, table_name, index_name):
+        print(f"  {table_name}.{index_name} already exists.")
+        return
+    parts = ", ".join(get_index_part(cursor, table_name, c) for c in columns)
+    cursor.execute(f"CREATE INDEX {index_name} ON {table_name} ({parts})")
+    print(f"  Added {table_name}.{index_name} ({parts}).")
+
+def create_query_indexes(cursor):
+    print("Creating indexes for the hot queries...")
+    for table_name, index_name, columns in QUERY_INDEXES:
+        add_index(cursor, table_name, index_name, columns)
+
+def add_date_part_columns(cursor):
+    # Month and day of graduates.dob / wad, derived from the free text on
+    # write (see roster_db.parse_month_day). NULL: no date or not derived
+    # yet; 0: a date that could not be read.
+    from roster_db import DATE_PART_COLUMNS
+    print("Adding month/day columns for dob and wad...")
+    for field, (month_column, day_column) in DATE_PART_COLUMNS.items():
+        add_column(cursor, "graduates", month_column, "TINYINT NULL")
+        add_column(cursor, "graduates", day_column, "TINYINT NULL")
+        add_index(cursor, "graduates", f"idx_graduates_{field}_month_day", (month_column, day_column))
+
+# Rows derived per batch
+DATE_BACKFILL_BATCH = 500
+
+def backfill_date_parts(cursor):
+    # Derives the month/day columns of rows that have a date but no derived
+    # month yet, a batch at a time in id order. Each batch is committed, so an
+    # interrupted backfill resumes where it stopped, and rows already derived
+    # (unreadable dates included, stored as 0) are not picked up again.
+    from roster_db import DATE_PART_COLUMNS, get_date_parts
+    print("Deriving dob/wad months and days...")
+    fields = list(DATE_PART_COLUMNS)
+    part_columns = [c for columns in DATE_PART_COLUMNS.values() for c in columns]
+    pending = " OR ".join(f"({field} IS NOT NULL AND {field} <> '' AND {month_column} IS NULL)"
+                          for field, (month_column, _) in DATE_PART_COLUMNS.items())
+    last_id = 0
+    derived = 0
+    while True:
+        cursor.execute(f"""SELECT id, {', '.join(fields)} FROM graduates
+                           WHERE id > %s AND ({pending}) ORDER BY id LIMIT {DATE_BACKFILL_BATCH}""", (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, *values in rows:
+            parts = get_date_parts(dict(zip(fields, values)))
+            updates.append(tuple(parts[c] for c in part_columns) + (row_id,))
+        cursor.executemany(f"UPDATE graduates SET {', '.join(f'{c}=%s' for c in part_columns)} WHERE id=%s", updates)
+        cursor.execute("COMMIT") # Keep finished batches if interrupted
+        last_id = rows[-1][0]
+        derived += len(rows)
+    print(f"  Derived dates of {derived} rows.")
+
+def get_hot_queries():
+    # (label, SQL, sample params, whole-table read) for the queries the app
+    # and the generators run, as the very strings they execute.
+    from roster_db import (LOGIN_QUERY, LOGOUT_QUERY, POSTS_QUERY, GRADUATES_BY_BRANCH_QUERY, MEMORIAM_REPORT_QUERY,
+                           MISSING_REPORT_QUERY, MEMORIAM_WALL_QUERY, MISSING_WALL_QUERY)
+    return [
+        ("login (verify_user)", LOGIN_QUERY, ("0",), False),
+        ("logout (user_logs)", LOGOUT_QUERY, (None, 0), False),
+        ("posts", POSTS_QUERY, (), True),
+        ("roster by branch (reports)", GRADUATES_BY_BRANCH_QUERY, (), True),
+        ("memoriam report", MEMORIAM_REPORT_QUERY, (), True),
+        ("missing contacts report", MISSING_REPORT_QUERY, (), True),
+        ("memoriam wall", MEMORIAM_WALL_QUERY, (), True),
+        ("missing contacts wall", MISSING_WALL_QUERY, (), True),
+    ]
+
+def check_query_plans(cursor):
+    # EXPLAINs every hot query and returns (problems, warnings). Lookups must
+    # not scan the whole table (type ALL); that is a problem. Whole-table
+    # reads visit every row anyway, and on a small table MySQL often prefers
+    # a scan plus filesort to walking an index (always so for columns with
+    # only a prefix index), so a filesort is only a warning.
+    problems = []
+    warnings = []
+    for label, sql, params, whole_table in get_hot_queries():
+        cursor.execute(f"EXPLAIN {sql}", params)
+        columns = [d[0] for d in cursor.description]
+        for row in cursor.fetchall():
+            plan = dict(zip(columns, row))
+            extra = str(plan.get("Extra") or "")
+            if plan.get("type") == "ALL" and not whole_table:
+                problems.append(f"{label}: full scan of {plan.get('table')}")
+            if "Using filesort" in extra:
+                warnings.append(f"{label}: filesort on {plan.get('table')}")
+    return problems, warnings
+
+MIGRATIONS = [
+    update_reports_table,
+    create_report_chunks_table,
+    move_report_blobs_to_chunks,
+    create_report_runs_table,
+    create_photos_table,
+    move_photos_to_store,
+    create_query_indexes,
+    add_date_part_columns,
+    backfill_date_parts,
+]
+
+def run_migrations():
+    conn = get_db_connection()
+    if not conn:
+        print("Failed to connect.")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        for migration in MIGRATIONS:
+            migration(cursor)
+        conn.commit()
+        print("Schema is up to date.")
+        return True
+    except Exception as e:
+        print(f"Error updating schema: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def run_plan_check():
+    conn = get_db_connection()
+    if not conn:
+        print("Failed to connect.")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        problems, warnings = check_query_plans(cursor)
+    except Exception as e:
+        print(f"Error checking query plans: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+    for warning in warnings:
+        print(f"  warning: {warning}")
+    for problem in problems:
+        print(f"  {problem}")
+    print("Query plans degraded." if problems else "All hot queries use their indexes.")
+    return not problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring the roster schema up to date.")
+    parser.add_argument("--check", action="store_true", help="Only check the plans of the hot queries.")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if run_plan_check() else 1)
+    sys.exit(0 if run_migrations() and run_plan_check() else 1)
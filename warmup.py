@@ -0,0 +1,130 @@
+import sys
+import time
+import argparse
+import threading
+from roster_db import get_db_connection, get_data_version, iter_batches
+from photo_store import get_thumbnails
+from report_store import get_report_info, fetch_report_file
+from build_reports import REPORTS
+import roster_data
+import roster_stats
+
+# Fills the caches the first visitors would otherwise pay for after a deploy:
+# the compact roster (see roster_data.py), the photo thumbnails, the
+# statistics and the stored PDFs. Each part is timed separately.
+#
+#     python warmup.py                 # everything (run_app.sh does this first)
+#     python warmup.py -p roster stats
+#
+# Run as a command it fills the on-disk caches shared by every process (the
+# roster parquet file, the photo and report directories). The app also runs
+# it on a thread when the server starts, which additionally fills the
+# in-memory roster and statistics caches of the server process.
+#
+# There is no separate search index: the sidebar search runs on the cached
+# roster, so warming the roster warms the search.
+
+# Photos per batch: one query for the originals, then each thumbnail size
+WARMUP_PHOTO_BATCH = 50
+
+# Tables whose photos are shown, with their hash columns and the thumbnail
+# sizes the app shows them at (app.py's *_PHOTO_PX): graduates in the grid,
+# the list views and the event cards/vCards, the Missing Contacts and
+# In Memoriam walls at one size each.
+PHOTO_TABLES = {
+    "graduates": (("photo_1966_hash", "photo_current_hash"), (400, 60, 150)),
+    "tracked": (("photo_hash",), (130,)),
+    "memoriam": (("photo_hash",), (150,)),
+}
+
+def warm_roster():
+    version = get_data_version(("graduates",))
+    df = roster_data.get_roster(version)
+    return f"{len(df)} graduates"
+
+def warm_stats():
+    version = get_data_version(("graduates",))
+    roster_stats.get_distributions(snapshot=roster_data.get_roster(version), version=version)
+    return "distributions"
+
+def get_photo_hashes(conn):
+    # {thumbnail size: sorted photo hashes shown at that size}
+    hashes = {}
+    cursor = conn.cursor()
+    try:
+        for table_name, (columns, sizes) in PHOTO_TABLES.items():
+            for column in columns:
+                cursor.execute(f"SELECT DISTINCT {column} FROM {table_name} WHERE {column} IS NOT NULL")
+                found = [h for (h,) in cursor.fetchall()]
+                for size in sizes:
+                    hashes.setdefault(size, set()).update(found)
+    finally:
+        cursor.close()
+    return {size: sorted(found) for size, found in hashes.items()}
+
+def warm_thumbnails():
+    # Only the sizes each photo is shown at. Originals are cached locally by
+    # the first size that needs them, so each photo is read from the DB once.
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Failed to connect to the database.")
+    try:
+        hashes = get_photo_hashes(conn)
+        for size, size_hashes in hashes.items():
+            for batch in iter_batches(size_hashes, WARMUP_PHOTO_BATCH):
+                get_thumbnails(batch, size, conn)
+    finally:
+        conn.close()
+    photos = len(set().union(*hashes.values()))
+    thumbnails = sum(len(size_hashes) for size_hashes in hashes.values())
+    return f"{photos} photos, {thumbnails} thumbnails"
+
+def warm_reports():
+    fetched = 0
+    for file_name, _, _ in REPORTS.values():
+        content_hash, _, _ = get_report_info(file_name)
+        if content_hash and fetch_report_file(content_hash):
+            fetched += 1
+    return f"{fetched}/{len(REPORTS)} reports"
+
+# Run in this order: the statistics reuse the roster
+WARMUP_PARTS = {
+    "roster": warm_roster,
+    "stats": warm_stats,
+    "thumbnails": warm_thumbnails,
+    "reports": warm_reports,
+}
+
+def warm_up(parts=None, log=print):
+    # Runs the selected parts (default: all) and returns {part: seconds}; a
+    # failing part is logged and skipped.
+    timings = {}
+    started = time.perf_counter()
+    for name in parts or list(WARMUP_PARTS):
+        part_started = time.perf_counter()
+        try:
+            detail = WARMUP_PARTS[name]()
+        except Exception as e:
+            detail = f"failed: {e}"
+        timings[name] = time.perf_counter() - part_started
+        log(f"[warmup] {name}: {timings[name]:.2f}s ({detail})")
+    log(f"[warmup] done in {time.perf_counter() - started:.2f}s")
+    return timings
+
+def start_warmup(parts=None):
+    # Warms up on a daemon thread so the server starts serving immediately.
+    thread = threading.Thread(target=warm_up, args=(parts,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the app's caches before traffic arrives.")
+    parser.add_argument("-p", "--parts", nargs="+", choices=list(WARMUP_PARTS), default=None,
+                        help="Parts to warm up (default: all).")
+    args = parser.parse_args(argv)
+    parts = [name for name in WARMUP_PARTS if name in args.parts] if args.parts else None
+    warm_up(parts, log=lambda line: print(line, file=sys.stderr))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())